@@ -5,8 +5,10 @@ import logging.config
 
 import falcon
 
+import media_handlers
 import messages
 import middlewares
+from db.models import compile_json_models
 from resources import account_resources, common_resources, user_resources, tournament_resources
 from settings import configure_logging
 from falcon_multipart.middleware import MultipartMiddleware
@@ -15,6 +17,7 @@ from falcon_multipart.middleware import MultipartMiddleware
 # LOGGING
 mylogger = logging.getLogger(__name__)
 configure_logging()
+compile_json_models()
 
 
 # DEFAULT 404
@@ -25,14 +28,23 @@ def handle_404(req, resp):
 
 
 # FALCON
-app = application = falcon.API(
+app = application = falcon.App(
     middleware=[
+        middlewares.RequestMetricsRecorder(),
+        middlewares.LazyLoadChecker(),
         middlewares.DBSessionManager(),
         middlewares.Falconi18n(),
         MultipartMiddleware()
     ]
 )
+json_media_handlers = {falcon.MEDIA_JSON: media_handlers.JSON_HANDLER}
+application.req_options.media_handlers.update(json_media_handlers)
+application.resp_options.media_handlers.update(json_media_handlers)
+
 application.add_route("/", common_resources.ResourceHome())
+application.add_route("/stats/cache", common_resources.ResourceCacheStats())
+application.add_route("/stats/pool", common_resources.ResourcePoolStats())
+application.add_route("/metrics", common_resources.ResourceMetrics())
 
 application.add_route("/account/profile", account_resources.ResourceAccountUserProfile())
 application.add_route("/account/create_token", account_resources.ResourceCreateUserToken())
@@ -0,0 +1,114 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# ASGI application for the read-heavy routes, built from the same resources as app.py. It runs on an async server:
+#
+#   uvicorn asgi:app --host 0.0.0.0 --port 8002
+#
+# One process keeps hundreds of requests in flight: while a query waits for MySQL (aiomysql) the event loop serves
+# the other requests, instead of tying up a whole sync worker. The routes that write (register, tokens, profile
+# updates, uploads) are only served by app.py.
+
+import contextvars
+import logging.config
+
+import falcon
+import falcon.asgi
+from sqlalchemy.util import greenlet_spawn
+
+import media_handlers
+import messages
+import metrics
+import middlewares
+from db import aio
+from db.models import compile_json_models
+from resources import account_resources, common_resources, user_resources, tournament_resources
+from settings import configure_logging
+
+# LOGGING
+mylogger = logging.getLogger(__name__)
+configure_logging()
+compile_json_models()
+
+
+class AsyncResource(object):
+    """Serves the GET responder of a resource of resources/ from falcon.asgi.
+
+    The responder, hooks included, runs inside AsyncSession.run_sync: it finds a regular Session in
+    req.context["db_session"] and its queries go through the async driver without blocking the event loop.
+    """
+
+    def __init__(self, resource):
+        self.resource = resource
+
+    async def on_get(self, req, resp, **kwargs):
+        # run_sync executes in a greenlet, which starts with an empty contextvars context (the request language)
+        context = contextvars.copy_context()
+        async with aio.create_async_db_session() as async_session:
+            await async_session.run_sync(
+                lambda db_session: context.run(self._on_get, db_session, req, resp, kwargs))
+
+        if (resp.stream is not None) and (not hasattr(resp.stream, "__aiter__")):
+            resp.stream = _iterate_in_greenlet(iter(resp.stream))
+
+    def _on_get(self, db_session, req, resp, kwargs):
+        req.context["db_session"] = db_session
+        self.resource.on_get(req, resp, **kwargs)
+
+
+async def _iterate_in_greenlet(iterator):
+    # Streamed responses (stream=true) query the database while they are consumed, so every chunk is produced in a
+    # greenlet where the async driver can be awaited
+    try:
+        while True:
+            chunk = await greenlet_spawn(next, iterator, None)
+            if chunk is None:
+                break
+            yield chunk
+    finally:
+        if hasattr(iterator, "close"):
+            await greenlet_spawn(iterator.close)
+
+
+class ResourceAsyncPoolStats(object):
+    async def on_get(self, req, resp, *args, **kwargs):
+        resp.media = aio.async_pool_stats()
+        resp.status = falcon.HTTP_200
+
+
+class ResourceAsyncMetrics(object):
+    async def on_get(self, req, resp, *args, **kwargs):
+        resp.data, resp.content_type = metrics.render()
+        resp.status = falcon.HTTP_200
+
+
+# DEFAULT 404
+# noinspection PyUnusedLocal
+async def handle_404(req, resp):
+    resp.media = messages.resource_not_found
+    resp.status = falcon.HTTP_404
+
+
+# FALCON
+app = application = falcon.asgi.App(
+    middleware=[
+        middlewares.RequestMetricsRecorder(),
+        middlewares.LazyLoadChecker(),
+        middlewares.Falconi18n()
+    ]
+)
+json_media_handlers = {falcon.MEDIA_JSON: media_handlers.JSON_HANDLER}
+application.req_options.media_handlers.update(json_media_handlers)
+application.resp_options.media_handlers.update(json_media_handlers)
+
+application.add_route("/", AsyncResource(common_resources.ResourceHome()))
+application.add_route("/stats/cache", AsyncResource(common_resources.ResourceCacheStats()))
+application.add_route("/stats/pool", ResourceAsyncPoolStats())
+application.add_route("/metrics", ResourceAsyncMetrics())
+
+application.add_route("/account/profile", AsyncResource(account_resources.ResourceAccountUserProfile()))
+application.add_route("/users/show/{username}", AsyncResource(user_resources.ResourceGetUserProfile()))
+application.add_route("/users", AsyncResource(user_resources.ResourceGetUsers()))
+application.add_route("/tournamets/list", AsyncResource(tournament_resources.ResourceGetTournaments()))
+application.add_route("/tournaments/show/{id}", AsyncResource(tournament_resources.ResourceGetTournament()))
+application.add_sink(handle_404, "")
@@ -0,0 +1,277 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+import collections
+import json
+import logging
+import os
+import sqlite3
+import stat
+import threading
+import time
+
+mylogger = logging.getLogger(__name__)
+
+
+class LRUTTLCache(object):
+    """Thread safe, size bounded LRU cache whose entries also expire ttl seconds after being stored."""
+
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key, default=None):
+        with self._lock:
+            aux_entry = self._entries.get(key)
+            if aux_entry is None:
+                return default
+            expires_at, value = aux_entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return default
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def delete_where(self, predicate):
+        with self._lock:
+            for key in [key for key, (expires_at, value) in self._entries.items() if predicate(key, value)]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class MemoryCacheBackend(object):
+    """Cache storage private to the current process."""
+
+    def __init__(self, max_size, ttl):
+        self._cache = LRUTTLCache(max_size, ttl)
+        self._cleared_at = 0.0
+
+    def get(self, key):
+        return self._cache.get(key)
+
+    def set(self, key, value):
+        self._cache.set(key, value)
+
+    def clear(self):
+        self._cleared_at = time.time()
+        self._cache.clear()
+
+    def cleared_at(self):
+        return self._cleared_at
+
+
+def ensure_private_directory(path):
+    # The cache file must not be writable by other users: create its directory as 0700 and refuse one that another
+    # user could have prepared (not ours, a symlink, or open to the group / others)
+    os.makedirs(path, mode=0o700, exist_ok=True)
+    aux_stat = os.lstat(path)
+    if (not stat.S_ISDIR(aux_stat.st_mode)) or (aux_stat.st_uid != os.getuid()) or (aux_stat.st_mode & 0o077):
+        raise PermissionError("{} must be a directory owned by this user with mode 0700".format(path))
+
+
+class _SQLiteConnections(object):
+    """One connection to the SQLite file per thread and process: sqlite3 connections can't be shared between threads
+    nor survive a fork."""
+
+    def __init__(self, path, schema):
+        ensure_private_directory(os.path.dirname(os.path.abspath(path)))
+        self.path = path
+        self.schema = schema
+        self._local = threading.local()
+
+    def get(self):
+        aux_connection = getattr(self._local, "connection", None)
+        if (aux_connection is None) or (self._local.pid != os.getpid()):
+            aux_connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            aux_connection.execute("PRAGMA journal_mode=WAL")
+            for statement in self.schema:
+                aux_connection.execute(statement)
+            self._local.connection = aux_connection
+            self._local.pid = os.getpid()
+        return aux_connection
+
+
+class SQLiteCacheBackend(object):
+    """Cache storage in a local SQLite file, shared by every process (gunicorn worker) of the host.
+
+    Values are (bytes, str or None) pairs, stored as a BLOB and a TEXT column: nothing read from the file is ever
+    unpickled or evaluated. Entries expire ttl seconds after being stored and the least recently used ones are removed
+    once there are more than max_size.
+    """
+
+    def __init__(self, path, max_size, ttl):
+        self.path = path
+        self.max_size = max_size
+        self.ttl = ttl
+        self._connections = _SQLiteConnections(path, (
+            "CREATE TABLE IF NOT EXISTS cache_pages (key TEXT PRIMARY KEY, data BLOB, text TEXT, expires_at REAL, "
+            "accessed_at REAL)",
+            "CREATE INDEX IF NOT EXISTS ix_cache_pages_accessed_at ON cache_pages (accessed_at)",
+            "CREATE TABLE IF NOT EXISTS cache_clears (id INTEGER PRIMARY KEY, cleared_at REAL)",
+        ))
+
+    def _connection(self):
+        return self._connections.get()
+
+    def get(self, key):
+        try:
+            aux_connection = self._connection()
+            aux_row = aux_connection.execute("SELECT data, text FROM cache_pages WHERE key = ? AND expires_at > ?",
+                                             (key, time.time())).fetchone()
+            if aux_row is None:
+                return None
+            aux_connection.execute("UPDATE cache_pages SET accessed_at = ? WHERE key = ?", (time.time(), key))
+            return bytes(aux_row[0]), aux_row[1]
+        except sqlite3.Error as e:
+            mylogger.warning("Result cache read failed: {}".format(e))
+            return None
+
+    def set(self, key, value):
+        aux_data, aux_text = value
+        if (not isinstance(aux_data, bytes)) or ((aux_text is not None) and (not isinstance(aux_text, str))):
+            raise TypeError("SQLiteCacheBackend stores (bytes, str or None) pairs")
+        try:
+            aux_connection = self._connection()
+            aux_now = time.time()
+            aux_connection.execute("INSERT OR REPLACE INTO cache_pages (key, data, text, expires_at, accessed_at) "
+                                   "VALUES (?, ?, ?, ?, ?)", (key, aux_data, aux_text, aux_now + self.ttl, aux_now))
+            aux_connection.execute("DELETE FROM cache_pages WHERE expires_at <= ? OR key IN (SELECT key FROM "
+                                   "cache_pages ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                                   (aux_now, self.max_size))
+        except sqlite3.Error as e:
+            mylogger.warning("Result cache write failed: {}".format(e))
+
+    def clear(self):
+        try:
+            aux_connection = self._connection()
+            aux_connection.execute("DELETE FROM cache_pages")
+            aux_connection.execute("INSERT OR REPLACE INTO cache_clears (id, cleared_at) VALUES (1, ?)", (time.time(),))
+        except sqlite3.Error as e:
+            mylogger.warning("Result cache clear failed: {}".format(e))
+
+    def cleared_at(self):
+        # Shared with the other workers, so a clear made by any of them counts
+        try:
+            aux_row = self._connection().execute("SELECT cleared_at FROM cache_clears WHERE id = 1").fetchone()
+            return aux_row[0] if aux_row is not None else 0.0
+        except sqlite3.Error as e:
+            mylogger.warning("Result cache read failed: {}".format(e))
+            # Unknown, so assume it has just been cleared
+            return time.time()
+
+
+class RevocationLog(object):
+    """When keys (e.g. auth tokens or users) were revoked, in a local SQLite file shared by every process of the host.
+
+    Entries cached by one worker are checked against it on every hit, so a revocation made through another worker is
+    seen immediately. Revocations older than ttl (the lifetime of the cached entries) are forgotten.
+    """
+
+    def __init__(self, path, ttl):
+        self.ttl = ttl
+        self._connections = _SQLiteConnections(path, (
+            "CREATE TABLE IF NOT EXISTS revocations (key TEXT PRIMARY KEY, revoked_at REAL)",
+            "CREATE INDEX IF NOT EXISTS ix_revocations_revoked_at ON revocations (revoked_at)",
+        ))
+
+    def revoke(self, key):
+        try:
+            aux_connection = self._connections.get()
+            aux_now = time.time()
+            aux_connection.execute("INSERT OR REPLACE INTO revocations (key, revoked_at) VALUES (?, ?)", (key, aux_now))
+            aux_connection.execute("DELETE FROM revocations WHERE revoked_at < ?", (aux_now - self.ttl,))
+        except sqlite3.Error as e:
+            mylogger.error("Revocation of {} not shared with the other workers: {}".format(key, e))
+
+    def revoked_since(self, keys, timestamp):
+        try:
+            aux_row = self._connections.get().execute(
+                "SELECT 1 FROM revocations WHERE key IN ({}) AND revoked_at >= ? LIMIT 1".format(
+                    ", ".join("?" * len(keys))), tuple(keys) + (timestamp,)).fetchone()
+            return aux_row is not None
+        except sqlite3.Error as e:
+            # Unknown, so the cached entry is not trusted
+            mylogger.warning("Revocation log read failed: {}".format(e))
+            return True
+
+
+def create_cache_backend(backend, max_size, ttl, sqlite_path=None):
+    if backend == "sqlite":
+        return SQLiteCacheBackend(sqlite_path, max_size, ttl)
+    return MemoryCacheBackend(max_size, ttl)
+
+
+# name -> ResultCache, to expose their statistics
+RESULT_CACHES = dict()
+
+
+class ResultCache(object):
+    """Cache of serialized responses keyed on the normalized request parameters, with hit/miss counters.
+
+    A replica can still be behind a commit that has just invalidated the cache: for replica_grace seconds after an
+    invalidation the results read from a replica are not stored, or they would be served stale until they expire.
+    """
+
+    def __init__(self, name, backend, replica_grace=0):
+        self.name = name
+        self.backend = backend
+        self.replica_grace = replica_grace
+        self.hits = 0
+        self.misses = 0
+        self.replica_skips = 0
+        RESULT_CACHES[name] = self
+
+    @staticmethod
+    def make_key(*values):
+        return json.dumps(values, default=str)
+
+    def get(self, key):
+        aux_value = self.backend.get(key)
+        if aux_value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return aux_value
+
+    def set(self, key, value, from_replica=False):
+        if from_replica and (time.time() - self.backend.cleared_at() < self.replica_grace):
+            self.replica_skips += 1
+            return False
+        self.backend.set(key, value)
+        return True
+
+    def invalidate(self):
+        mylogger.debug("Invalidating {} result cache".format(self.name))
+        self.backend.clear()
+
+    @property
+    def stats(self):
+        aux_requests = self.hits + self.misses
+        return {
+            "backend": type(self.backend).__name__,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": (float(self.hits) / aux_requests) if aux_requests > 0 else None,
+            "replica_skips": self.replica_skips,
+        }
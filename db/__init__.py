@@ -1,17 +1,140 @@
 #!/usr/bin/python
 # -*- coding: utf-8 -*-
 
+import random
+
 from sqlalchemy import create_engine
-from sqlalchemy.orm import scoped_session, sessionmaker
+from sqlalchemy.engine.url import URL, make_url
+from sqlalchemy.orm import Session, scoped_session, sessionmaker
+
+import metrics
+import settings
+from db.pool import MeasuredQueuePool, install_fork_guard
+
+
+def database_url():
+    if settings.DB_URL is not None:
+        return make_url(settings.DB_URL)
+    return URL.create("mysql+pymysql", username=settings.DB_USERNAME, password=settings.DB_PASSWORD,
+                      host=settings.DB_HOST, port=int(settings.DB_PORT), database=settings.DB_NAME,
+                      query={"charset": "utf8"})
+
+
+def create_db_engine(url, name="primary"):
+    connect_args = dict()
+    if make_url(url).get_backend_name() == "sqlite":
+        # Pooled connections are used by other threads than the one that opened them (e.g. thumbnails.py callbacks)
+        connect_args["check_same_thread"] = False
+    engine = create_engine(
+        url, encoding=settings.DB_ENCODING, echo=False, poolclass=MeasuredQueuePool, pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_POOL_MAX_OVERFLOW, pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE, pool_pre_ping=settings.DB_POOL_PRE_PING, pool_logging_name=name,
+        connect_args=connect_args)
+    install_fork_guard(engine)
+    metrics.install_sql_metrics(engine)
+    return engine
+
+
+class RoutingSession(Session):
+    """Session that sends the queries of read only requests to a replica and everything else to the primary.
 
-from settings import DB_USERNAME, DB_PASSWORD, DB_HOST, DB_PORT, DB_NAME, DB_ENCODING
+    With read_only the SELECTs go to one of REPLICA_ENGINES (the same one for the whole session). Once the session
+    flushes or executes an INSERT / UPDATE / DELETE it sticks to the primary until it is closed, so a request reads its
+    own writes. Without replicas every query goes to the primary (bind).
+    """
 
-DB_ENGINE = create_engine(
-    "mysql+pymysql://{}:{}@{}:{}/{}?charset=utf8".format(DB_USERNAME, DB_PASSWORD, DB_HOST, DB_PORT, DB_NAME),
-    encoding=DB_ENCODING, echo=False, pool_recycle=3600)
-DB_SESSION_FACTORY = sessionmaker(bind=DB_ENGINE)
+    def __init__(self, read_only=False, **kwargs):
+        super().__init__(**kwargs)
+        self.read_only = read_only
+        self._replica_engine = None
+        self._use_primary = False
+
+    @property
+    def read_from_replica(self):
+        # True once a query of the session has gone to a replica, even if it uses the primary from then on
+        return self._replica_engine is not None
+
+    def stick_to_primary(self):
+        # Returns True if the session was reading from a replica, i.e. if repeating a query can give another result
+        aux_was_replica = self._replica_engine is not None and not self._use_primary
+        self._use_primary = True
+        return aux_was_replica
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        if self._flushing or getattr(clause, "is_dml", False):
+            self._use_primary = True
+        if self.read_only and (not self._use_primary) and (len(REPLICA_ENGINES) > 0):
+            if self._replica_engine is None:
+                self._replica_engine = random.choice(REPLICA_ENGINES)
+            return self._replica_engine
+        return super().get_bind(mapper=mapper, clause=clause, **kwargs)
+
+    def close(self):
+        super().close()
+        self._replica_engine = None
+        self._use_primary = False
+
+
+DB_ENGINE = create_db_engine(database_url())
+REPLICA_ENGINES = [create_db_engine(url, "replica{}".format(i)) for i, url in enumerate(settings.DB_REPLICA_URLS)]
+DB_SESSION_FACTORY = sessionmaker(bind=DB_ENGINE, class_=RoutingSession)
 DB_SCOPED_SESSION_FACTORY = scoped_session(DB_SESSION_FACTORY)
 
 
-def create_db_session():
-    return DB_SESSION_FACTORY()
+def create_db_session(**kwargs):
+    return DB_SESSION_FACTORY(**kwargs)
+
+
+def reset_engine_after_fork():
+    # The connections inherited from the parent share its sockets: they are dropped without being closed, closing
+    # them would close the parent's connections too
+    for engine in [DB_ENGINE] + REPLICA_ENGINES:
+        engine.pool = engine.pool.recreate()
+
+
+def pool_stats():
+    if len(REPLICA_ENGINES) > 0:
+        return dict(DB_ENGINE.pool.stats, replicas=[engine.pool.stats for engine in REPLICA_ENGINES])
+    return DB_ENGINE.pool.stats
+
+
+def stick_to_primary(db_session):
+    # Sessions that are not a RoutingSession (e.g. the ones of asgi.py) always use the primary
+    aux_stick_to_primary = getattr(db_session, "stick_to_primary", None)
+    return aux_stick_to_primary() if aux_stick_to_primary is not None else False
+
+
+def read_from_replica(db_session):
+    return getattr(db_session, "read_from_replica", False)
+
+
+class LazyDBSession(object):
+    """Request scoped session proxy: the real session is only created the first time the request uses it."""
+
+    def __init__(self, session_factory=None, read_only=False):
+        self._session_factory = DB_SESSION_FACTORY if session_factory is None else session_factory
+        self._read_only = read_only
+        self._session = None
+
+    @property
+    def session(self):
+        if self._session is None:
+            self._session = self._session_factory(read_only=self._read_only) if self._read_only \
+                else self._session_factory()
+        return self._session
+
+    @property
+    def opened(self):
+        return self._session is not None
+
+    def __getattr__(self, name):
+        return getattr(self.session, name)
+
+    def close(self, rollback=False):
+        if self._session is not None:
+            try:
+                if rollback:
+                    self._session.rollback()
+            finally:
+                self._session.close()
+                self._session = None
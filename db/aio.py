@@ -0,0 +1,41 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+import metrics
+import settings
+import db
+from db.pool import MeasuredAsyncQueuePool
+
+# Async driver used for each of the sync drivers of db.DB_ENGINE
+ASYNC_DRIVERS = {
+    "mysql+pymysql": "mysql+aiomysql",
+    "mysql": "mysql+aiomysql",
+    "sqlite": "sqlite+aiosqlite",
+    "sqlite+pysqlite": "sqlite+aiosqlite",
+}
+
+
+def async_database_url(url):
+    return url.set(drivername=ASYNC_DRIVERS.get(url.drivername, url.drivername))
+
+
+def create_async_db_engine(url):
+    engine = create_async_engine(
+        async_database_url(url), echo=False, poolclass=MeasuredAsyncQueuePool, pool_size=settings.ASYNC_DB_POOL_SIZE,
+        max_overflow=settings.ASYNC_DB_POOL_MAX_OVERFLOW, pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE, pool_pre_ping=settings.DB_POOL_PRE_PING, pool_logging_name="async")
+    metrics.install_sql_metrics(engine.sync_engine)
+    return engine
+
+
+ASYNC_DB_ENGINE = create_async_db_engine(db.database_url())
+
+
+def create_async_db_session():
+    return AsyncSession(ASYNC_DB_ENGINE)
+
+
+def async_pool_stats():
+    return ASYNC_DB_ENGINE.sync_engine.pool.stats
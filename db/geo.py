@@ -0,0 +1,134 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+import math
+
+import sqlalchemy as sa
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_LATITUDE_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+GEOHASH_PRECISION = 9  # cel·les de ~5m x 5m
+GEOHASH_MAX_CELLS = 16  # prefixos que es fan servir com a màxim per cobrir una bounding box
+
+_GEOHASH_ALPHABET = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+
+def encode_geohash(latitude, longitude, precision=GEOHASH_PRECISION):
+    latitude_range = [-90.0, 90.0]
+    longitude_range = [-180.0, 180.0]
+    geohash = list()
+    bits = 0
+    bits_count = 0
+    even_bit = True
+    while len(geohash) < precision:
+        # Els bits parells parteixen la longitud i els senars la latitud
+        aux_range, aux_value = (longitude_range, longitude) if even_bit else (latitude_range, latitude)
+        middle = (aux_range[0] + aux_range[1]) / 2
+        if aux_value >= middle:
+            bits = (bits << 1) | 1
+            aux_range[0] = middle
+        else:
+            bits = bits << 1
+            aux_range[1] = middle
+        even_bit = not even_bit
+        bits_count += 1
+        if bits_count == 5:
+            geohash.append(_GEOHASH_ALPHABET[bits])
+            bits = 0
+            bits_count = 0
+    return "".join(geohash)
+
+
+def haversine_km(latitude_1, longitude_1, latitude_2, longitude_2):
+    phi_1 = math.radians(latitude_1)
+    phi_2 = math.radians(latitude_2)
+    delta_phi = math.radians(latitude_2 - latitude_1)
+    delta_lambda = math.radians(longitude_2 - longitude_1)
+    a = math.sin(delta_phi / 2) ** 2 + math.cos(phi_1) * math.cos(phi_2) * math.sin(delta_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def bounding_box(latitude, longitude, radius_km):
+    """Returns (min_lat, min_lon, max_lat, max_lon) of the circle. min_lon > max_lon when it crosses the
+    antimeridian, and the longitude range is the whole world when the circle contains a pole."""
+    delta_latitude = radius_km / KM_PER_LATITUDE_DEGREE
+    min_latitude = latitude - delta_latitude
+    max_latitude = latitude + delta_latitude
+    if (min_latitude <= -90) or (max_latitude >= 90):
+        return max(min_latitude, -90.0), -180.0, min(max_latitude, 90.0), 180.0
+
+    # Amplada a la latitud on el paral·lel és més curt
+    delta_longitude = math.degrees(radius_km / (EARTH_RADIUS_KM * math.cos(
+        math.radians(max(abs(min_latitude), abs(max_latitude))))))
+    if delta_longitude >= 180:
+        return min_latitude, -180.0, max_latitude, 180.0
+    min_longitude = longitude - delta_longitude
+    max_longitude = longitude + delta_longitude
+    if min_longitude < -180:
+        min_longitude += 360
+    if max_longitude > 180:
+        max_longitude -= 360
+    return min_latitude, min_longitude, max_latitude, max_longitude
+
+
+def _longitude_ranges(min_longitude, max_longitude):
+    if min_longitude <= max_longitude:
+        return [(min_longitude, max_longitude)]
+    return [(min_longitude, 180.0), (-180.0, max_longitude)]
+
+
+def _cell_range(range_start, range_end, step, cells_count):
+    return range(int(range_start // step), min(int(range_end // step), cells_count - 1) + 1)
+
+
+def geohash_cells(min_latitude, min_longitude, max_latitude, max_longitude, max_cells=GEOHASH_MAX_CELLS):
+    """Geohash prefixes whose cells cover the bounding box, using the longest precision that needs at most
+    max_cells of them. Returns None when not even precision 1 fits (the box is almost the whole world)."""
+    for precision in range(GEOHASH_PRECISION, 0, -1):
+        latitude_cells_count = 2 ** (5 * precision // 2)
+        longitude_cells_count = 2 ** ((5 * precision + 1) // 2)
+        latitude_step = 180.0 / latitude_cells_count
+        longitude_step = 360.0 / longitude_cells_count
+
+        # Els range no es recorren fins que la precisio hi cap: a precisio 9 en poden ser milions
+        latitude_cells = _cell_range(min_latitude + 90, max_latitude + 90, latitude_step, latitude_cells_count)
+        longitude_ranges = [_cell_range(range_start + 180, range_end + 180, longitude_step, longitude_cells_count)
+                            for range_start, range_end in _longitude_ranges(min_longitude, max_longitude)]
+
+        if len(latitude_cells) * sum(len(cells) for cells in longitude_ranges) <= max_cells:
+            # Cada cel·la es codifica pel seu centre
+            return sorted({encode_geohash(-90 + (latitude_cell + 0.5) * latitude_step,
+                                          -180 + (longitude_cell + 0.5) * longitude_step, precision)
+                           for latitude_cell in latitude_cells for cells in longitude_ranges
+                           for longitude_cell in cells})
+    return None
+
+
+def backfill_geohashes(connection, batch_size=1000):
+    """Sets facilities.geohash from latitude and longitude where it is missing or out of date (rows written before the
+    column existed or without the ORM, which is what keeps it up to date). Returns the number of rows updated."""
+    # Taula definida aqui i no amb db.models: les migracions la fan servir amb l'esquema de la seva revisio
+    facilities = sa.table("facilities", sa.column("id"), sa.column("latitude"), sa.column("longitude"),
+                          sa.column("geohash"))
+    updated = 0
+    last_id = None
+    while True:
+        aux_query = sa.select(facilities.c.id, facilities.c.latitude, facilities.c.longitude, facilities.c.geohash) \
+            .order_by(facilities.c.id).limit(batch_size)
+        if last_id is not None:
+            aux_query = aux_query.where(facilities.c.id > last_id)
+        rows = connection.execute(aux_query).fetchall()
+        if len(rows) == 0:
+            return updated
+        changes = list()
+        for row in rows:
+            geohash = None if (row.latitude is None) or (row.longitude is None) \
+                else encode_geohash(row.latitude, row.longitude)
+            if geohash != row.geohash:
+                changes.append({"facility_id": row.id, "new_geohash": geohash})
+        if len(changes) > 0:
+            connection.execute(facilities.update().where(facilities.c.id == sa.bindparam("facility_id"))
+                               .values(geohash=sa.bindparam("new_geohash")), changes)
+            updated += len(changes)
+        last_id = rows[-1].id
@@ -2,11 +2,30 @@
 # -*- coding: utf-8 -*-
 
 import abc
+import collections
 import datetime
+import enum
+import threading
 
 import falcon
+from sqlalchemy import inspect
 
-from settings import DATETIME_DEFAULT_FORMAT, DATE_DEFAULT_FORMAT, TIME_DEFAULT_FORMAT
+from settings import DATETIME_DEFAULT_FORMAT, DATE_DEFAULT_FORMAT, TIME_DEFAULT_FORMAT, JSON_SUBSET_CACHE_SIZE
+
+
+def _convert_value(aux_attribute):
+    if isinstance(aux_attribute, JSONModel) and aux_attribute is not None:
+        return aux_attribute.json_model
+    elif isinstance(aux_attribute, datetime.datetime):
+        return aux_attribute.strftime(DATETIME_DEFAULT_FORMAT)
+    elif isinstance(aux_attribute, datetime.date):
+        return aux_attribute.strftime(DATE_DEFAULT_FORMAT)
+    elif isinstance(aux_attribute, datetime.time):
+        return aux_attribute.strftime(TIME_DEFAULT_FORMAT)
+    elif isinstance(aux_attribute, enum.Enum):
+        return aux_attribute.value
+    else:
+        return aux_attribute
 
 
 class JSONModel(object):
@@ -16,17 +35,7 @@ class JSONModel(object):
         final_model = dict()
         try:
             for current_key in attributes.keys():
-                aux_attribute = getattr(self, attributes[current_key])
-                if isinstance(aux_attribute, JSONModel) and aux_attribute is not None:
-                    final_model[current_key] = aux_attribute.json_model
-                elif isinstance(aux_attribute, datetime.datetime):
-                    final_model[current_key] = aux_attribute.strftime(DATETIME_DEFAULT_FORMAT)
-                elif isinstance(aux_attribute, datetime.date):
-                    final_model[current_key] = aux_attribute.strftime(DATE_DEFAULT_FORMAT)
-                elif isinstance(aux_attribute, datetime.time):
-                    final_model[current_key] = aux_attribute.strftime(TIME_DEFAULT_FORMAT)
-                else:
-                    final_model[current_key] = aux_attribute
+                final_model[current_key] = _convert_value(getattr(self, attributes[current_key]))
             return final_model
         except KeyError as e:
             raise falcon.HTTPInternalServerError(description=str(e))
@@ -37,3 +46,79 @@ class JSONModel(object):
 
     def to_json_model(self, **attributes):
         return self._create_json_model(**attributes)
+
+
+class JSONSerializer(object):
+    """Builds the JSON model of a mapped class for a fixed set of fields.
+
+    Fields are given as json key -> attribute name, or json key -> (relationship name, JSONSerializer) for related
+    models. On compile() a function with one expression per field is generated, so serializing a row does no getattr
+    lookups by name nor isinstance checks. Datetimes and enums are left as they are: the JSON media handler
+    (media_handlers.py) encodes them while writing the response.
+    """
+
+    def __init__(self, model_class, **attributes):
+        self.model_class = model_class
+        self.attributes = attributes
+        self._serialize = None
+        self._subsets = collections.OrderedDict()
+        self._subsets_lock = threading.Lock()
+
+    def __call__(self, instance):
+        if self._serialize is None:
+            self.compile()
+        return self._serialize(instance)
+
+    def subset(self, fields):
+        # The fields come from the request (?fields=): every order and repetition of the same set shares one
+        # serializer, with the keys in the order of the full model, and only the last JSON_SUBSET_CACHE_SIZE are kept
+        aux_fields = set(fields)
+        unknown_fields = aux_fields.difference(self.attributes)
+        if len(unknown_fields) > 0:
+            raise ValueError("{} has no field {}".format(self.model_class.__name__, ", ".join(sorted(unknown_fields))))
+        fields = tuple(field for field in self.attributes if field in aux_fields)
+        with self._subsets_lock:
+            aux_serializer = self._subsets.get(fields)
+            if aux_serializer is not None:
+                self._subsets.move_to_end(fields)
+                return aux_serializer
+        aux_serializer = JSONSerializer(self.model_class, **{field: self.attributes[field] for field in fields})
+        aux_serializer.compile()
+        with self._subsets_lock:
+            self._subsets[fields] = aux_serializer
+            while len(self._subsets) > JSON_SUBSET_CACHE_SIZE:
+                self._subsets.popitem(last=False)
+        return aux_serializer
+
+    def compile(self):
+        mapper = inspect(self.model_class)
+        namespace = dict()
+        body_lines = list()
+        model_lines = list()
+        for index, (key, attribute) in enumerate(self.attributes.items()):
+            nested_serializer = None
+            if isinstance(attribute, tuple):
+                attribute, nested_serializer = attribute
+            if (not attribute.isidentifier()) or (attribute not in dir(self.model_class)):
+                raise ValueError("{} has no attribute {}".format(self.model_class.__name__, attribute))
+
+            if attribute in mapper.relationships:
+                value = "value_{}".format(index)
+                if nested_serializer is not None:
+                    namespace["nested_{}".format(index)] = nested_serializer
+                    item_template = "nested_{}({{0}})".format(index)
+                else:
+                    item_template = "{0}.json_model"
+                if mapper.relationships[attribute].uselist:
+                    expression = "[{} for item in {}]".format(item_template.format("item"), value)
+                else:
+                    expression = "None if {} is None else {}".format(value, item_template.format(value))
+                body_lines.append("    {} = instance.{}".format(value, attribute))
+                model_lines.append("        {!r}: {},".format(key, expression))
+            else:
+                model_lines.append("        {!r}: instance.{},".format(key, attribute))
+
+        source = "\n".join(["def serialize(instance):"] + body_lines + ["    return {"] + model_lines + ["    }"])
+        exec(compile(source, "<{} JSONSerializer>".format(self.model_class.__name__), "exec"), namespace)
+        self._serialize = namespace["serialize"]
+        return self
@@ -0,0 +1,108 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Development check for N+1 queries: reports a relationship that lazy loads for a second instance of the same model
+# within one request, which is what touching it in a loop over query results (e.g. in a JSONSerializer) does. Enabled
+# with DAMCore_LAZY_LOAD_CHECK=log (a warning per model and attribute) or =raise (LazyLoadInLoop, a 500).
+# Many-to-one relationships whose target is already in the session do not query, so they are never reported. The mode
+# is read from settings.LAZY_LOAD_CHECK on every request, so it can also be changed after import (e.g. by tests).
+
+import collections
+import contextvars
+import logging
+import os
+import threading
+import traceback
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+import settings
+
+mylogger = logging.getLogger(__name__)
+
+CHECK_MODES = ("off", "log", "raise")
+PROJECT_DIRECTORY = os.path.dirname(os.path.abspath(settings.__file__))
+# Frames that are never the call site: this module and JSONSerializer.__call__
+_IGNORED_FILES = (os.path.abspath(__file__), os.path.join(os.path.dirname(os.path.abspath(__file__)), "json_model.py"))
+
+# Lazy loads of the request being handled, mutable for the same reason as metrics.CURRENT_REQUEST
+CURRENT_REQUEST = contextvars.ContextVar("current_request_lazy_loads", default=None)
+
+# (model.attribute, call site) -> times reported in this process, for dev/benchmarks/suite.py
+REPORTED = collections.Counter()
+_reported_lock = threading.Lock()
+
+
+class LazyLoadInLoop(Exception):
+    pass
+
+
+class RequestLazyLoads(object):
+    def __init__(self):
+        self.instances = collections.defaultdict(set)  # (model, attribute) -> identity keys that lazy loaded it
+        self.reported = set()
+
+
+def enabled():
+    if settings.LAZY_LOAD_CHECK not in CHECK_MODES:
+        raise ValueError("LAZY_LOAD_CHECK must be one of {}".format(", ".join(CHECK_MODES)))
+    return settings.LAZY_LOAD_CHECK != "off"
+
+
+def start_request():
+    return CURRENT_REQUEST.set(RequestLazyLoads()) if enabled() else None
+
+
+def finish_request(token):
+    if token is not None:
+        CURRENT_REQUEST.reset(token)
+
+
+def _format_frame(frame):
+    aux_filename = frame.filename
+    if aux_filename.startswith(PROJECT_DIRECTORY + os.sep):
+        aux_filename = os.path.relpath(aux_filename, PROJECT_DIRECTORY)
+    return "{}:{} in {}".format(aux_filename, frame.lineno, frame.name)
+
+
+def _call_site():
+    # Innermost frame of the project (a resource, a model property) and, if it is another one, the innermost frame
+    # outside SQLAlchemy (e.g. the code generated by a JSONSerializer)
+    caller_frame = None
+    for frame in reversed(traceback.extract_stack()):
+        if ("sqlalchemy" in frame.filename.split(os.sep)) or (frame.filename in _IGNORED_FILES):
+            continue
+        if caller_frame is None:
+            caller_frame = frame
+        if frame.filename.startswith(PROJECT_DIRECTORY + os.sep):
+            if frame is caller_frame:
+                return _format_frame(frame)
+            return "{} via {}".format(_format_frame(frame), _format_frame(caller_frame))
+    return _format_frame(caller_frame) if caller_frame is not None else "unknown"
+
+
+def _check_lazy_load(orm_execute_state):
+    request_lazy_loads = CURRENT_REQUEST.get()
+    if (request_lazy_loads is None) or (orm_execute_state.lazy_loaded_from is None) or (not enabled()):
+        return
+    instance_state = orm_execute_state.lazy_loaded_from
+    relationship_key = (instance_state.class_.__name__, orm_execute_state.loader_strategy_path.path[-1].key)
+    aux_instances = request_lazy_loads.instances[relationship_key]
+    aux_instances.add(instance_state.key)
+    if (len(aux_instances) < 2) or (relationship_key in request_lazy_loads.reported):
+        return
+
+    # Once per relationship and request: the rest of the loop would repeat it
+    request_lazy_loads.reported.add(relationship_key)
+    call_site = _call_site()
+    with _reported_lock:
+        REPORTED["{}.{}".format(*relationship_key), call_site] += 1
+    message = "{}.{} lazy loaded for {} instances in one request (N+1 queries) at {}".format(
+        relationship_key[0], relationship_key[1], len(aux_instances), call_site)
+    if settings.LAZY_LOAD_CHECK == "raise":
+        raise LazyLoadInLoop(message)
+    mylogger.warning(message)
+
+
+event.listen(Session, "do_orm_execute", _check_lazy_load)
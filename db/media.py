@@ -0,0 +1,66 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+import hashlib
+import logging
+import os
+
+import settings
+import thumbnails
+
+mylogger = logging.getLogger(__name__)
+
+VERSION_LENGTH = 12  # hex digits of the SHA-256 used as ?v= of the default images
+
+
+def _file_version(file_path):
+    try:
+        with open(file_path, "rb") as f:
+            return hashlib.sha256(f.read()).hexdigest()[:VERSION_LENGTH]
+    except OSError:
+        mylogger.warning("{} not found, its URL is not versioned".format(file_path))
+        return None
+
+
+class MediaURLBuilder(object):
+    """URLs of the images stored for one field (e.g. users.photo).
+
+    The parts shared by every row are joined once, so building a URL is a single format(). Uploads are named by the
+    SHA-256 of their content (resources.utils.save_static_media_file) and the default image carries the hash of its
+    content as ?v=, so the content behind a URL never changes and it can be cached as immutable.
+    """
+
+    def __init__(self, table_name, attribute_name):
+        base_url = "http://{}/{}{}{}/".format(settings.STATIC_HOSTNAME, settings.STATIC_URL, settings.MEDIA_PREFIX,
+                                              table_name)
+        self.url_template = base_url + "{}/" + attribute_name + "/{}"
+        self.default_url = base_url + attribute_name + "/" + settings.DEFAULT_IMAGE_NAME
+        default_version = _file_version(os.path.normpath(os.path.join(
+            settings.STATIC_DIRECTORY, settings.MEDIA_PREFIX, table_name, attribute_name, settings.DEFAULT_IMAGE_NAME)))
+        if default_version is not None:
+            self.default_url += "?v=" + default_version
+        self.default_thumbnail_urls = {str(size): {image_format: self.default_url
+                                                   for image_format in settings.THUMBNAIL_FORMATS}
+                                       for size in settings.THUMBNAIL_SIZES}
+
+    def url(self, instance_id, filename):
+        if filename is None:
+            return self.default_url
+        return self.url_template.format(instance_id, filename)
+
+    def thumbnail_urls(self, instance_id, filename, raw_sizes):
+        # size -> format -> url. Every size points to the original image until its thumbnails are on disk
+        if filename is None:
+            return self.default_thumbnail_urls
+        original_url = self.url_template.format(instance_id, filename)
+        ready_sizes = thumbnails.parse_sizes(raw_sizes)
+        aux_urls = dict()
+        for size in settings.THUMBNAIL_SIZES:
+            if size in ready_sizes:
+                aux_urls[str(size)] = {
+                    image_format: self.url_template.format(instance_id,
+                                                           thumbnails.thumbnail_filename(filename, size, image_format))
+                    for image_format in settings.THUMBNAIL_FORMATS}
+            else:
+                aux_urls[str(size)] = {image_format: original_url for image_format in settings.THUMBNAIL_FORMATS}
+        return aux_urls
@@ -0,0 +1,26 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+import os
+
+from alembic import command
+from alembic.config import Config
+
+ALEMBIC_CONFIG_PATH = os.path.join(os.path.abspath(os.path.dirname(__file__)), "..", "alembic.ini")
+
+
+def alembic_config(connection=None):
+    # Called from scripts that already configured the logging; without a connection migrations/env.py uses db.DB_ENGINE
+    config = Config(ALEMBIC_CONFIG_PATH)
+    config.attributes["configure_logging"] = False
+    if connection is not None:
+        config.attributes["connection"] = connection
+    return config
+
+
+def upgrade(connection=None, revision="head"):
+    command.upgrade(alembic_config(connection), revision)
+
+
+def downgrade(connection=None, revision="-1"):
+    command.downgrade(alembic_config(connection), revision)
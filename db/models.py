@@ -6,21 +6,21 @@ import datetime
 import enum
 import logging
 import os
-from _operator import and_
-from builtins import getattr
-from urllib.parse import urljoin
 
 import falcon
-from passlib.hash import pbkdf2_sha256
-from sqlalchemy import Column, Date, DateTime, Enum, ForeignKey, Integer, Unicode, \
-    UnicodeText, Float, Table, case, type_coerce
+from sqlalchemy import Column, Date, DateTime, Enum, ForeignKey, Index, Integer, Unicode, \
+    UnicodeText, Float, Table, and_, case, or_, type_coerce, event, inspect, select
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.ext.hybrid import hybrid_method, hybrid_property
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import Session, configure_mappers, relationship
 from sqlalchemy_i18n import make_translatable
 from falcon_multipart.middleware import MultipartMiddleware
 import messages
-from db.json_model import JSONModel
+from db import geo
+from db.media import MediaURLBuilder
+from db.json_model import JSONModel, JSONSerializer
+from db.passwords import hash_password, verify_password
+from workers import WorkerPoolSaturated
 import settings
 
 mylogger = logging.getLogger(__name__)
@@ -29,24 +29,10 @@ SQLAlchemyBase = declarative_base()
 make_translatable(options={"locales": settings.get_accepted_languages()})
 
 
-def _generate_media_url(class_instance, class_attibute_name, default_image=False):
-    class_base_url = urljoin(urljoin(urljoin("http://{}".format(settings.STATIC_HOSTNAME), settings.STATIC_URL),
-                                     settings.MEDIA_PREFIX),
-                             class_instance.__tablename__ + "/")
-    class_attribute = getattr(class_instance, class_attibute_name)
-    if class_attribute is not None:
-        return urljoin(urljoin(urljoin(urljoin(class_base_url, class_attribute), str(class_instance.id) + "/"),
-                               class_attibute_name + "/"), class_attribute)
-    else:
-        if default_image:
-            return urljoin(urljoin(class_base_url, class_attibute_name + "/"), settings.DEFAULT_IMAGE_NAME)
-        else:
-            return class_attribute
-
-
 def _generate_media_path(class_instance, class_attibute_name):
-    class_path = "/{0}{1}{2}/{3}/{4}/".format(settings.STATIC_URL, settings.MEDIA_PREFIX, class_instance.__tablename__,
-                                              str(class_instance.id), class_attibute_name)
+    # Directory of STATIC_DIRECTORY served at the URLs of db.media.MediaURLBuilder
+    class_path = os.path.join(os.path.normpath(settings.STATIC_DIRECTORY), settings.MEDIA_PREFIX,
+                              class_instance.__tablename__, str(class_instance.id), class_attibute_name, "")
     return class_path
 
 class RolEnum(enum.Enum):
@@ -107,7 +93,9 @@ Column("round_id", Integer, ForeignKey("rounds.id",
 onupdate="CASCADE", ondelete="CASCADE"), nullable=False),
 Column("match_id", Integer,
 ForeignKey("matches.id", onupdate="CASCADE", ondelete="CASCADE"),
-nullable=False)
+nullable=False),
+Index("ix_round_matches_round_match", "round_id", "match_id"),
+Index("ix_round_matches_match_round", "match_id", "round_id")
 )
 class Round(SQLAlchemyBase, JSONModel):
     __tablename__ = "rounds"
@@ -122,11 +110,7 @@ class Round(SQLAlchemyBase, JSONModel):
 
     @hybrid_property
     def json_model(self):
-        return {
-            "round_id": self.id,
-            "category_id": self.category_id,
-            "matches": [match.json_model for match in self.matches],
-        }
+        return ROUND_JSON_MODEL(self)
 
 class Couple(SQLAlchemyBase, JSONModel):
     __tablename__ = "couples"
@@ -159,15 +143,7 @@ class Match(SQLAlchemyBase, JSONModel):
 
     @hybrid_property
     def json_model(self):
-      return {
-            "couple1_player1": self.couple1_p1.to_json_model(id="id", name="name", surname="surname"),
-            "couple1_player2": self.couple1_p2.to_json_model(id="id", name="name", surname="surname"),
-            "couple2_player1": self.couple2_p1.to_json_model(id="id", name="name", surname="surname"),
-            "couple2_player2": self.couple2_p2.to_json_model(id="id", name="name", surname="surname"),
-            "set1": self.set1,
-            "set2": self.set2,
-            "set3": self.set3
-        }
+        return MATCH_JSON_MODEL(self)
 
 TournamentInscriptionsAssociation = Table("tournament_inscriptions_association",
 SQLAlchemyBase.metadata,
@@ -175,7 +151,9 @@ Column("tournament_id", Integer,ForeignKey("tournaments.id",
         onupdate="CASCADE", ondelete="CASCADE"), nullable=False),
 Column("users_id", Integer,
        ForeignKey("users.id", onupdate="CASCADE", ondelete="CASCADE"),
-       nullable=False)
+       nullable=False),
+Index("ix_tournament_inscriptions_tournament_user", "tournament_id", "users_id"),
+Index("ix_tournament_inscriptions_user_tournament", "users_id", "tournament_id")
 )
 
 TournamentCategoriesAssociation = Table("tournament_categories_association",
@@ -184,7 +162,9 @@ Column("tournament_id", Integer, ForeignKey("tournaments.id",
         onupdate="CASCADE", ondelete="CASCADE"), nullable=False),
 Column("category_id", Integer,
        ForeignKey("categories.id", onupdate="CASCADE", ondelete="CASCADE"),
-       nullable=False)
+       nullable=False),
+Index("ix_tournament_categories_tournament_category", "tournament_id", "category_id"),
+Index("ix_tournament_categories_category_tournament", "category_id", "tournament_id")
 )
 
 
@@ -199,8 +179,8 @@ class UserToken(SQLAlchemyBase):
 class Category(SQLAlchemyBase, JSONModel):
     __tablename__ = "categories"
     id = Column(Integer, primary_key=True)
-    genere = Column(Enum(TournamentGenereEnum), nullable=False)
-    age = Column(Enum(AgeCategoriesTypeEnum), nullable=False)
+    genere = Column(Enum(TournamentGenereEnum), nullable=False, index=True)
+    age = Column(Enum(AgeCategoriesTypeEnum), nullable=False, index=True)
     level = Column(Integer)
 
     tournament_categories = relationship("Tournament",
@@ -209,13 +189,7 @@ class Category(SQLAlchemyBase, JSONModel):
 
     @hybrid_property
     def json_model(self):
-        return {
-            "id": self.id,
-            "genere": self.genere.value,
-            "age": self.age.value,
-            "level": self.level,
-
-        }
+        return CATEGORY_JSON_MODEL(self)
 
 class Facility(SQLAlchemyBase, JSONModel):
     __tablename__ = "facilities"
@@ -223,6 +197,7 @@ class Facility(SQLAlchemyBase, JSONModel):
     name = Column(Unicode(255), nullable=False)
     latitude = Column(Float)
     longitude = Column(Float)
+    geohash = Column(Unicode(geo.GEOHASH_PRECISION), index=True)  # Es calcula a partir de latitude i longitude
     address = Column(Unicode(255))
     postal_code = Column(Unicode(12))
     town = Column(Unicode(12))
@@ -233,25 +208,57 @@ class Facility(SQLAlchemyBase, JSONModel):
 
     tournaments = relationship("Tournament", back_populates="facility")
 
+    @classmethod
+    def nearby_filter(cls, latitude, longitude, radius_km):
+        # Prefiltre per bounding box: els prefixos de geohash fan servir l'index i la latitud/longitud descarten les
+        # vores de les cel·les. La distancia exacta es calcula despres amb geo.haversine_km.
+        min_latitude, min_longitude, max_latitude, max_longitude = geo.bounding_box(latitude, longitude, radius_km)
+        conditions = [cls.latitude.between(min_latitude, max_latitude)]
+        if min_longitude <= max_longitude:
+            conditions.append(cls.longitude.between(min_longitude, max_longitude))
+        else:
+            conditions.append(or_(cls.longitude >= min_longitude, cls.longitude <= max_longitude))
+        aux_cells = geo.geohash_cells(min_latitude, min_longitude, max_latitude, max_longitude)
+        if aux_cells is not None:
+            # Rangs en lloc de LIKE perque l'index es faci servir a tots els motors ("{" va just després de "z")
+            conditions.append(or_(*[and_(cls.geohash >= cell, cls.geohash < cell + "{") for cell in aux_cells]))
+        return and_(*conditions)
+
+
+@event.listens_for(Facility, "before_insert")
+@event.listens_for(Facility, "before_update")
+def _update_facility_geohash(mapper, connection, target):
+    if (target.latitude is None) or (target.longitude is None):
+        target.geohash = None
+    else:
+        target.geohash = geo.encode_geohash(target.latitude, target.longitude)
+
 
 class Tournament(SQLAlchemyBase, JSONModel):
     __tablename__ = "tournaments"
+    __table_args__ = (
+        # Filtres per status: open (finish_register_date > now) i playing (finish_date > now)
+        Index("ix_tournaments_status_register", "finish_register_date", "finish_date"),
+        Index("ix_tournaments_status_finish", "finish_date", "finish_register_date"),
+    )
     id = Column(Integer, primary_key=True)
     created_at = Column(DateTime, default=datetime.datetime.now, nullable=False)
     edited_at = Column(DateTime, default=None)
+    version = Column(Integer, nullable=False, default=1, server_default="1")
     name = Column(Unicode(255), nullable=False)
     start_date = Column(DateTime, nullable=False)
     finish_date = Column(DateTime, nullable=False)
     start_register_date = Column(DateTime, nullable=False)
     finish_register_date = Column(DateTime, nullable=False)
     limit_couples = Column(Integer)
-    inscription_type = Column(Enum(TournamentPrivacyTypeEnum)) # Public o privat (requeix codi d'invitació)
+    inscription_type = Column(Enum(TournamentPrivacyTypeEnum), index=True) # Public o privat (requeix codi d'invitació)
     type = Column(Enum(TournamentTypeEnum), nullable=False)
     price_1 = Column(Float, nullable=False)
     price_2 = Column(Float, nullable=False)
 
     description = Column(UnicodeText)
     poster = Column(Unicode(255))
+    poster_thumbnails = Column(Unicode(64))  # sizes generated, see thumbnails.py
 
     # Relació (User-Tournament) per tenir l'organitzador.
     owner_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -271,16 +278,21 @@ class Tournament(SQLAlchemyBase, JSONModel):
     #Relació rondes
     rounds = relationship("Round", back_populates="tournament")
 
-    @hybrid_property
-    def status(self):
-        current_datetime = datetime.datetime.now()
-        if current_datetime < self.finish_register_date:
+    @staticmethod
+    def status_at(finish_register_date, finish_date, current_datetime=None):
+        if current_datetime is None:
+            current_datetime = datetime.datetime.now()
+        if current_datetime < finish_register_date:
             return TournamentStatusEnum.open
-        elif (current_datetime > self.finish_register_date) and (current_datetime < self.finish_date):
+        elif (current_datetime > finish_register_date) and (current_datetime < finish_date):
             return TournamentStatusEnum.playing
         else:
             return TournamentStatusEnum.closed
 
+    @hybrid_property
+    def status(self):
+        return Tournament.status_at(self.finish_register_date, self.finish_date)
+
     @status.expression
     def status(cls):
         current_datetime = datetime.datetime.now()
@@ -289,35 +301,41 @@ class Tournament(SQLAlchemyBase, JSONModel):
                 (current_datetime < cls.finish_register_date,
                  type_coerce(TournamentStatusEnum.open, Enum(TournamentStatusEnum))),
                 (and_(current_datetime > cls.finish_register_date, current_datetime < cls.finish_date),
-                 type_coerce(TournamentStatusEnum.in_game, Enum(TournamentStatusEnum)))
+                 type_coerce(TournamentStatusEnum.playing, Enum(TournamentStatusEnum)))
             ],
             else_=type_coerce(TournamentStatusEnum.closed, Enum(TournamentStatusEnum))
         )
 
+    @classmethod
+    def status_filter(cls, status, current_datetime=None):
+        # Same rules as status_at written as plain comparisons on the columns, so they can use the status indexes
+        # (a CASE expression can't)
+        if current_datetime is None:
+            current_datetime = datetime.datetime.now()
+        if status == TournamentStatusEnum.open:
+            return cls.finish_register_date > current_datetime
+        elif status == TournamentStatusEnum.playing:
+            return and_(cls.finish_date > current_datetime, cls.finish_register_date < current_datetime)
+        else:
+            return or_(cls.finish_register_date == current_datetime,
+                       and_(cls.finish_date <= current_datetime, cls.finish_register_date <= current_datetime))
+
 
     @hybrid_property
     def json_model(self):
-        return {
-                "id": self.id,
-                "price_1": self.price_1,
-                "finish_date": self.finish_date.strftime(settings.DATETIME_DEFAULT_FORMAT),
-                "finish_register_date": self.finish_register_date.strftime(settings.DATETIME_DEFAULT_FORMAT),
-                "description": self.description,
-                "created_at": self.created_at.strftime(settings.DATETIME_DEFAULT_FORMAT),
-                "name": self.name,
-                "inscription_type" : self.inscription_type.value,
-                "start_date": self.created_at.strftime(settings.DATETIME_DEFAULT_FORMAT),
-                "status": self.status.value,
-                "type": self.type.value,
-                "facility": self.facility.to_json_model(id="id", name="name", provincia="provincia", town="town",
-                                                    latitude="latitude", longitude="longitude"),
-                "categories": [category.json_model for category in self.categories],
-                "rounds": [round.json_model for round in self.rounds],
-         }
+        return TOURNAMENT_JSON_MODEL(self)
 
     @hybrid_property
     def poster_url(self):
-        return _generate_media_url(self, "poster", default_image=True)
+        return TOURNAMENT_POSTER_URLS.url(self.id, self.poster)
+
+    @hybrid_property
+    def poster_thumbnail_urls(self):
+        return TOURNAMENT_POSTER_URLS.thumbnail_urls(self.id, self.poster, self.poster_thumbnails)
+
+    @hybrid_property
+    def poster_path(self):
+        return _generate_media_path(self, "poster")
 
 
 
@@ -328,47 +346,67 @@ class User(SQLAlchemyBase, JSONModel):
 
     id = Column(Integer, primary_key=True)
     created_at = Column(DateTime, default=datetime.datetime.now, nullable=False)
+    version = Column(Integer, nullable=False, default=1, server_default="1")
     username = Column(Unicode(50), nullable=False, unique=True)
     password = Column(UnicodeText, nullable=False)
-    email = Column(Unicode(255), nullable=False)
+    email = Column(Unicode(255), nullable=False, index=True)
     tokens = relationship("UserToken", back_populates="user", cascade="all, delete-orphan")
     name = Column(Unicode(50))
     surname = Column(Unicode(50))
     birthdate = Column(Date)
     genere = Column(Enum(GenereEnum), nullable=False)
-    rol = Column(Enum(RolEnum), nullable=False)
+    rol = Column(Enum(RolEnum), nullable=False, index=True)
     position = Column(Enum(PositionEnum))
     phone = Column(Unicode(50))
     photo = Column(Unicode(255))
+    photo_thumbnails = Column(Unicode(64))  # sizes generated, see thumbnails.py
     license = Column(Enum(LicenseEnum))
     matchname = Column(Unicode(50))
     prefsmash = Column(Enum(SmashEnum))
-    club = Column(Unicode(50))
+    club = Column(Unicode(50), index=True)
     timeplay= Column(Unicode(50))
 
     tournament_owner = relationship("Tournament", back_populates="owner")
     tournament_inscriptions = relationship("Tournament", back_populates="inscriptions")
 
+    # json_model fields and the attribute each one is built from, used for sparse fieldsets
+    JSON_MODEL_ATTRIBUTES = {
+        "created_at": "created_at",
+        "username": "username",
+        "email": "email",
+        "password": "password",
+        "name": "name",
+        "surname": "surname",
+        "birthdate": "birthdate",
+        "genere": "genere",
+        "rol": "rol",
+        "position": "position",
+        "phone": "phone",
+        "photo": "photo_url",
+        "photo_thumbnails": "photo_thumbnail_urls",
+        "matchname": "matchname",
+        "timeplay": "timeplay",
+        "prefsmash": "prefsmash",
+        "club": "club",
+        "license": "license",
+    }
+    # Columns needed by the attributes that are not plain columns
+    JSON_MODEL_COLUMNS = {
+        "photo_url": ("id", "photo"),
+        "photo_thumbnail_urls": ("id", "photo", "photo_thumbnails"),
+    }
+
     @hybrid_property
     def public_profile(self):
-        return {
-            "created_at": self.created_at.strftime(settings.DATETIME_DEFAULT_FORMAT),
-            "username": self.username,
-            "name": self.name,
-            "email": self.email,
-            "genere": self.genere.value,
-            "photo": self.photo,
-            "rol": self.rol.value,
-            "position": self.position.value,
-            "matchname": self.matchname,
-            "timeplay": self.timeplay,
-            "prefsmash": self.prefsmash.value,
-            "club": self.club
-        }
+        return USER_PUBLIC_PROFILE_JSON_MODEL(self)
 
     @hybrid_property
     def photo_url(self):
-        return _generate_media_url(self, "photo", default_image=True)
+        return USER_PHOTO_URLS.url(self.id, self.photo)
+
+    @hybrid_property
+    def photo_thumbnail_urls(self):
+        return USER_PHOTO_URLS.thumbnail_urls(self.id, self.photo, self.photo_thumbnails)
 
     @hybrid_property
     def photo_path(self):
@@ -377,11 +415,21 @@ class User(SQLAlchemyBase, JSONModel):
 
     @hybrid_method
     def set_password(self, password_string):
-        self.password = pbkdf2_sha256.hash(password_string)
+        try:
+            self.password = hash_password(password_string)
+        except WorkerPoolSaturated:
+            raise falcon.HTTPServiceUnavailable(description=messages.server_busy, retry_after=1)
 
     @hybrid_method
     def check_password(self, password_string):
-        return pbkdf2_sha256.verify(password_string, self.password)
+        try:
+            valid, new_hash = verify_password(password_string, self.password)
+        except WorkerPoolSaturated:
+            raise falcon.HTTPServiceUnavailable(description=messages.server_busy, retry_after=1)
+        # Re-hash transparently when the stored hash was made with other parameters
+        if valid and (new_hash is not None):
+            self.password = new_hash
+        return valid
 
     @hybrid_method
     def create_token(self):
@@ -392,27 +440,137 @@ class User(SQLAlchemyBase, JSONModel):
         else:
             raise falcon.HTTPBadRequest(title=messages.quota_exceded, description=messages.maximum_tokens_exceded)
 
+    @classmethod
+    def json_model_columns(cls, fields):
+        aux_columns = list()
+        for field in fields:
+            aux_attribute = cls.JSON_MODEL_ATTRIBUTES[field]
+            for column in cls.JSON_MODEL_COLUMNS.get(aux_attribute, (aux_attribute,)):
+                if column not in aux_columns:
+                    aux_columns.append(column)
+        return aux_columns
+
+    @hybrid_method
+    def sparse_json_model(self, fields):
+        return USER_JSON_MODEL.subset(fields)(self)
+
     @hybrid_property
     def json_model(self):
-        return {
-            "created_at": self.created_at.strftime(settings.DATETIME_DEFAULT_FORMAT),
-            "username": self.username,
-            "email": self.email,
-            "password": self.password,
-            "name": self.name,
-            "surname": self.surname,
-            "birthdate": self.birthdate.strftime(
-                settings.DATE_DEFAULT_FORMAT) if self.birthdate is not None else self.birthdate,
-            "genere": self.genere.value,
-            "rol": self.rol.value,
-            "position":self.position.value,
-            "phone": self.phone,
-            "photo": self.photo_url,
-            "matchname": self.matchname,
-            "timeplay": self.timeplay,
-            "prefsmash": self.prefsmash.value,
-            "club": self.club,
-            "license": self.license
-
-
-        }
+        return USER_JSON_MODEL(self)
+
+
+# -------------------- ROW VERSIONS --------------------
+# User.version and Tournament.version change every time the row (or, for tournaments, one of their rounds or matches)
+# changes, and are used to build the ETags of their resources. A tournament also embeds its facility, its categories
+# and the name of the players of its matches, so changing those fields changes the version of every tournament that
+# includes them.
+_TOURNAMENT_EMBEDDED_ATTRIBUTES = {
+    Facility: ("name", "provincia", "town", "latitude", "longitude"),
+    Category: ("genere", "age", "level"),
+    User: ("name", "surname"),
+}
+
+
+def _embedded_changes(session, instance):
+    attributes = _TOURNAMENT_EMBEDDED_ATTRIBUTES[type(instance)]
+    return (instance in session.deleted) or any(inspect(instance).attrs[attribute].history.has_changes()
+                                                for attribute in attributes)
+
+
+def _embedding_tournaments_filter(session):
+    changed_ids = {model_class: set() for model_class in _TOURNAMENT_EMBEDDED_ATTRIBUTES}
+    for instance in set(session.dirty) | set(session.deleted):
+        if (type(instance) in changed_ids) and (instance.id is not None) and _embedded_changes(session, instance):
+            changed_ids[type(instance)].add(instance.id)
+
+    conditions = list()
+    if len(changed_ids[Facility]) > 0:
+        conditions.append(Tournament.facility_id.in_(changed_ids[Facility]))
+    if len(changed_ids[Category]) > 0:
+        conditions.append(Tournament.id.in_(
+            select(TournamentCategoriesAssociation.c.tournament_id)
+            .where(TournamentCategoriesAssociation.c.category_id.in_(changed_ids[Category]))))
+    if len(changed_ids[User]) > 0:
+        conditions.append(Tournament.id.in_(
+            select(Round.tournament_id)
+            .join(RoundMatchesAssociation, RoundMatchesAssociation.c.round_id == Round.id)
+            .join(Match, Match.id == RoundMatchesAssociation.c.match_id)
+            .where(or_(*[player_id.in_(changed_ids[User]) for player_id in (
+                Match.couple1_player1_id, Match.couple1_player2_id, Match.couple2_player1_id,
+                Match.couple2_player2_id)]))))
+    return or_(*conditions) if len(conditions) > 0 else None
+
+
+def _round_tournament(session, aux_round):
+    if (aux_round.tournament is None) and (aux_round.tournament_id is not None):
+        with session.no_autoflush:
+            return session.query(Tournament).get(aux_round.tournament_id)
+    return aux_round.tournament
+
+
+@event.listens_for(Session, "before_flush")
+def _increment_versions(session, flush_context, instances):
+    versioned_instances = set()
+    for instance in session.dirty:
+        # The collections of a user (tokens, inscriptions) are not part of its JSON models, those of a tournament are
+        if isinstance(instance, (User, Tournament)) and session.is_modified(
+                instance, include_collections=isinstance(instance, Tournament)):
+            versioned_instances.add(instance)
+    for instance in set(session.new) | set(session.dirty) | set(session.deleted):
+        if isinstance(instance, Round):
+            versioned_instances.add(_round_tournament(session, instance))
+        elif isinstance(instance, Match):
+            versioned_instances.update(_round_tournament(session, aux_round) for aux_round in instance.round)
+
+    versioned_instances.discard(None)
+    for instance in versioned_instances:
+        if (instance not in session.new) and (instance not in session.deleted):
+            instance.version = type(instance).version + 1
+
+    aux_filter = _embedding_tournaments_filter(session)
+    if aux_filter is not None:
+        with session.no_autoflush:
+            session.query(Tournament).filter(aux_filter) \
+                .update({Tournament.version: Tournament.version + 1}, synchronize_session=False)
+
+
+# -------------------- MEDIA URLS --------------------
+USER_PHOTO_URLS = MediaURLBuilder(User.__tablename__, "photo")
+TOURNAMENT_POSTER_URLS = MediaURLBuilder(Tournament.__tablename__, "poster")
+
+
+# -------------------- JSON MODELS --------------------
+USER_NAME_JSON_MODEL = JSONSerializer(User, id="id", name="name", surname="surname")
+USER_JSON_MODEL = JSONSerializer(User, **User.JSON_MODEL_ATTRIBUTES)
+USER_PUBLIC_PROFILE_JSON_MODEL = JSONSerializer(User, created_at="created_at", username="username", name="name",
+                                                email="email", genere="genere", photo="photo",
+                                                photo_thumbnails="photo_thumbnail_urls", rol="rol",
+                                                position="position", matchname="matchname", timeplay="timeplay",
+                                                prefsmash="prefsmash", club="club")
+
+MATCH_JSON_MODEL = JSONSerializer(Match, couple1_player1=("couple1_p1", USER_NAME_JSON_MODEL),
+                                  couple1_player2=("couple1_p2", USER_NAME_JSON_MODEL),
+                                  couple2_player1=("couple2_p1", USER_NAME_JSON_MODEL),
+                                  couple2_player2=("couple2_p2", USER_NAME_JSON_MODEL),
+                                  set1="set1", set2="set2", set3="set3")
+ROUND_JSON_MODEL = JSONSerializer(Round, round_id="id", category_id="category_id",
+                                  matches=("matches", MATCH_JSON_MODEL))
+CATEGORY_JSON_MODEL = JSONSerializer(Category, id="id", genere="genere", age="age", level="level")
+FACILITY_JSON_MODEL = JSONSerializer(Facility, id="id", name="name", provincia="provincia", town="town",
+                                     latitude="latitude", longitude="longitude")
+
+TOURNAMENT_JSON_MODEL = JSONSerializer(Tournament, id="id", price_1="price_1", finish_date="finish_date",
+                                       finish_register_date="finish_register_date", description="description",
+                                       created_at="created_at", name="name", inscription_type="inscription_type",
+                                       start_date="created_at", status="status", type="type",
+                                       poster="poster_url", poster_thumbnails="poster_thumbnail_urls",
+                                       facility=("facility", FACILITY_JSON_MODEL),
+                                       categories=("categories", CATEGORY_JSON_MODEL),
+                                       rounds=("rounds", ROUND_JSON_MODEL))
+
+
+def compile_json_models():
+    configure_mappers()
+    for json_serializer in (USER_NAME_JSON_MODEL, USER_JSON_MODEL, USER_PUBLIC_PROFILE_JSON_MODEL, MATCH_JSON_MODEL,
+                            ROUND_JSON_MODEL, CATEGORY_JSON_MODEL, FACILITY_JSON_MODEL, TOURNAMENT_JSON_MODEL):
+        json_serializer.compile()
@@ -0,0 +1,28 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+from passlib.context import CryptContext
+
+import settings
+from workers import BoundedProcessPool
+
+# Hashes whose rounds differ from PASSWORD_HASH_ROUNDS are reported as outdated by verify_and_update
+PASSWORD_CONTEXT = CryptContext(schemes=["pbkdf2_sha256"], pbkdf2_sha256__rounds=settings.PASSWORD_HASH_ROUNDS)
+PASSWORD_HASHING_POOL = BoundedProcessPool(settings.PASSWORD_HASH_WORKERS, settings.PASSWORD_HASH_MAX_PENDING)
+
+
+def _hash_password(password_string):
+    return PASSWORD_CONTEXT.hash(password_string)
+
+
+def _verify_password(password_string, password_hash):
+    return PASSWORD_CONTEXT.verify_and_update(password_string, password_hash)
+
+
+def hash_password(password_string):
+    return PASSWORD_HASHING_POOL.run(_hash_password, password_string)
+
+
+def verify_password(password_string, password_hash):
+    # Returns (valid, new_hash), new_hash is only set when the stored hash uses outdated parameters
+    return PASSWORD_HASHING_POOL.run(_verify_password, password_string, password_hash)
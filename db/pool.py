@@ -0,0 +1,99 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+import os
+import threading
+import time
+
+from sqlalchemy import event, exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+import metrics
+
+
+class PoolMetricsMixin(object):
+    """Counts checkouts, timeouts and the time spent waiting for a free connection of a QueuePool.
+
+    The pool is named with create_engine(pool_logging_name=...), which also survives the recreate() after a fork, and
+    its usage is exported to the Prometheus metrics of metrics.py under that name.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super(PoolMetricsMixin, self).__init__(*args, **kwargs)
+        self._metrics_lock = threading.Lock()
+        self._checkouts = 0
+        self._timeouts = 0
+        self._wait_time_total = 0.0
+        self._wait_time_max = 0.0
+
+    @property
+    def metrics_name(self):
+        return self._orig_logging_name or "primary"
+
+    def _do_get(self):
+        start = time.perf_counter()
+        timed_out = False
+        try:
+            return super(PoolMetricsMixin, self)._do_get()
+        except exc.TimeoutError:
+            timed_out = True
+            with self._metrics_lock:
+                self._timeouts += 1
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._metrics_lock:
+                self._checkouts += 1
+                self._wait_time_total += elapsed
+                self._wait_time_max = max(self._wait_time_max, elapsed)
+                aux_wait_time_max = self._wait_time_max
+            metrics.observe_pool_checkout(self.metrics_name, elapsed, aux_wait_time_max, timed_out)
+            self._export_usage()
+
+    def _do_return_conn(self, record):
+        try:
+            super(PoolMetricsMixin, self)._do_return_conn(record)
+        finally:
+            self._export_usage()
+
+    def _export_usage(self):
+        metrics.set_pool_usage(self.metrics_name, self.checkedout(), max(self.overflow(), 0))
+
+    @property
+    def stats(self):
+        with self._metrics_lock:
+            return {
+                "pid": os.getpid(),
+                "size": self.size(),
+                "max_overflow": self._max_overflow,
+                "checked_out": self.checkedout(),
+                "checked_in": self.checkedin(),
+                "overflow": max(self.overflow(), 0),
+                "checkouts": self._checkouts,
+                "timeouts": self._timeouts,
+                "wait_time_avg_ms": (self._wait_time_total / self._checkouts * 1000) if self._checkouts > 0 else 0.0,
+                "wait_time_max_ms": self._wait_time_max * 1000,
+            }
+
+
+class MeasuredQueuePool(PoolMetricsMixin, QueuePool):
+    pass
+
+
+class MeasuredAsyncQueuePool(PoolMetricsMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def install_fork_guard(engine):
+    # A connection opened by another process (inherited through a fork) is never used: it is discarded on checkout
+    # and the pool opens a new one
+    @event.listens_for(engine, "connect")
+    def _remember_pid(dbapi_connection, connection_record):
+        connection_record.info["pid"] = os.getpid()
+
+    @event.listens_for(engine, "checkout")
+    def _check_pid(dbapi_connection, connection_record, connection_proxy):
+        if connection_record.info["pid"] != os.getpid():
+            connection_record.dbapi_connection = connection_proxy.dbapi_connection = None
+            raise exc.DisconnectionError("Connection record belongs to pid {}, attempting to check out in pid {}"
+                                         .format(connection_record.info["pid"], os.getpid()))
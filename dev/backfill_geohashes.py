@@ -0,0 +1,22 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Fills facilities.geohash for the facilities stored before the column existed or written without the ORM (bulk
+# inserts, UPDATE statements), which Facility.nearby_filter would never find. Safe to run more than once.
+#
+#   PYTHONPATH=. python dev/backfill_geohashes.py
+
+import logging
+
+import db
+import settings
+from db import geo
+
+# LOGGING
+mylogger = logging.getLogger(__name__)
+settings.configure_logging()
+
+
+if __name__ == "__main__":
+    with db.DB_ENGINE.begin() as connection:
+        mylogger.info("Facilities updated: {}".format(geo.backfill_geohashes(connection)))
@@ -0,0 +1,80 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Encodes a /tournamets/list payload the way it was done before (datetimes and enums converted in Python, then
+# falcon's default JSON handler) and with the JSON media handlers of media_handlers.py, checking that the stdlib
+# handler writes exactly the same bytes.
+#
+#   python dev/benchmarks/media_handler.py --tournaments 500
+
+import argparse
+import datetime
+import timeit
+
+import falcon
+from falcon import media
+
+from db.json_model import _convert_value
+from db.models import Tournament, Facility, Category, Round, Match, User, TournamentTypeEnum, \
+    TournamentPrivacyTypeEnum, TournamentGenereEnum, AgeCategoriesTypeEnum, GenereEnum, RolEnum, compile_json_models
+from media_handlers import create_json_handler
+
+
+def build_tournaments(count):
+    now = datetime.datetime(2020, 5, 1, 12, 30, 0)
+    users = [User(id=i, name="player", surname=str(i), genere=GenereEnum.male, rol=RolEnum.player) for i in range(32)]
+    facility = Facility(id=1, name="Club Tennis Manresa", latitude=41.748809, longitude=1.844407,
+                        provincia="Barcelona", town="Manresa")
+    categories = [Category(id=1, genere=TournamentGenereEnum.mixt, age=AgeCategoriesTypeEnum.seniors),
+                  Category(id=2, genere=TournamentGenereEnum.male, age=AgeCategoriesTypeEnum.juniors)]
+    tournaments = list()
+    for i in range(count):
+        rounds = [Round(id=r, category_id=1, matches=[
+            Match(id=m, couple1_p1=users[m], couple1_p2=users[m + 1], couple2_p1=users[m + 2],
+                  couple2_p2=users[m + 3], set1="6/3", set2="6/4", set3="0/0") for m in range(0, 16, 4)])
+            for r in range(3)]
+        tournaments.append(Tournament(id=i, created_at=now, name="Torneig {}".format(i), start_date=now,
+                                      finish_date=now + datetime.timedelta(days=30),
+                                      start_register_date=now - datetime.timedelta(days=10),
+                                      finish_register_date=now + datetime.timedelta(days=20), price_1=20, price_2=8,
+                                      description="Torneig de pàdel ñ", type=TournamentTypeEnum.draft,
+                                      inscription_type=TournamentPrivacyTypeEnum.public, facility=facility,
+                                      categories=categories, rounds=rounds))
+    return tournaments
+
+
+def convert_in_python(media_object):
+    if isinstance(media_object, dict):
+        return {key: convert_in_python(value) for key, value in media_object.items()}
+    elif isinstance(media_object, list):
+        return [convert_in_python(value) for value in media_object]
+    return _convert_value(media_object)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tournaments", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    compile_json_models()
+    payload = [tournament.json_model for tournament in build_tournaments(args.tournaments)]
+    default_handler = media.JSONHandler()
+    handlers = [("json", create_json_handler("json")), ("orjson", create_json_handler("orjson"))]
+
+    def previous_path():
+        return default_handler.serialize(convert_in_python(payload), falcon.MEDIA_JSON)
+
+    expected = previous_path()
+    assert handlers[0][1].serialize(payload, falcon.MEDIA_JSON) == expected, "stdlib handler output changed"
+    print("payload: {} tournaments, {} bytes".format(args.tournaments, len(expected)))
+
+    previous_time = min(timeit.repeat(previous_path, number=1, repeat=args.repeat))
+    print("{:<28} {:>8.1f} ms".format("convert + default handler", previous_time * 1000))
+    for name, handler in handlers:
+        handler_time = min(timeit.repeat(lambda: handler.serialize(payload, falcon.MEDIA_JSON), number=1,
+                                         repeat=args.repeat))
+        same_bytes = handler.serialize(payload, falcon.MEDIA_JSON) == expected
+        print("{:<28} {:>8.1f} ms   x{:.1f}   {}".format(name + " media handler", handler_time * 1000,
+                                                         previous_time / handler_time,
+                                                         "same bytes" if same_bytes else "different bytes"))
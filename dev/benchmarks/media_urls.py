@@ -0,0 +1,44 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Builds photo_url for the same users with the previous urljoin chain and with the precomputed db.media.MediaURLBuilder
+# of User, and checks that both give the same URLs.
+#
+#   python dev/benchmarks/media_urls.py --rows 10000
+
+import argparse
+import hashlib
+import timeit
+from urllib.parse import urljoin
+
+import settings
+from db.models import User, USER_PHOTO_URLS
+
+
+def urljoin_media_url(class_instance, class_attibute_name):
+    # _generate_media_url as it was before db/media.py
+    class_base_url = urljoin(urljoin(urljoin("http://{}".format(settings.STATIC_HOSTNAME), settings.STATIC_URL),
+                                     settings.MEDIA_PREFIX),
+                             class_instance.__tablename__ + "/")
+    class_attribute = getattr(class_instance, class_attibute_name)
+    if class_attribute is not None:
+        return urljoin(urljoin(urljoin(urljoin(class_base_url, class_attribute), str(class_instance.id) + "/"),
+                               class_attibute_name + "/"), class_attribute)
+    return urljoin(urljoin(class_base_url, class_attibute_name + "/"), settings.DEFAULT_IMAGE_NAME)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    users = [User(id=i, photo=hashlib.sha256(str(i).encode("ascii")).hexdigest() + ".png") for i in range(args.rows)]
+    assert [urljoin_media_url(user, "photo") for user in users] == [user.photo_url for user in users]
+
+    urljoin_time = min(timeit.repeat(lambda: [urljoin_media_url(user, "photo") for user in users], number=1,
+                                     repeat=args.repeat))
+    builder_time = min(timeit.repeat(lambda: [USER_PHOTO_URLS.url(user.id, user.photo) for user in users], number=1,
+                                     repeat=args.repeat))
+    print("photo_url  urljoin {:>8.1f} ms   builder {:>8.1f} ms   x{:.1f}".format(
+        urljoin_time * 1000, builder_time * 1000, urljoin_time / builder_time))
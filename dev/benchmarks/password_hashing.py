@@ -0,0 +1,48 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Login throughput of a single gunicorn worker: verifies passwords from N concurrent threads, hashing inline in the
+# worker and through the password hashing process pool.
+#
+#   python dev/benchmarks/password_hashing.py --threads 8 --logins 400 --pool-workers 1 2 4
+
+import argparse
+import concurrent.futures
+import time
+
+import settings
+from db import passwords
+from workers import BoundedProcessPool, WorkerPoolSaturated
+
+
+def run_logins(password_hash, threads, logins):
+    rejected = 0
+    start = time.perf_counter()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=threads) as executor:
+        for future in [executor.submit(passwords.verify_password, "000000", password_hash) for _ in range(logins)]:
+            try:
+                future.result()
+            except WorkerPoolSaturated:
+                rejected += 1
+    elapsed = time.perf_counter() - start
+    return (logins - rejected) / elapsed, rejected
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--threads", type=int, default=8, help="concurrent requests handled by the worker")
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--pool-workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--max-pending", type=int, default=settings.PASSWORD_HASH_MAX_PENDING)
+    args = parser.parse_args()
+
+    stored_hash = passwords.PASSWORD_CONTEXT.hash("000000")
+    print("pbkdf2_sha256 rounds: {}".format(settings.PASSWORD_HASH_ROUNDS))
+
+    for pool_workers in [0] + args.pool_workers:
+        passwords.PASSWORD_HASHING_POOL = BoundedProcessPool(pool_workers, args.max_pending)
+        logins_per_second, rejected_logins = run_logins(stored_hash, args.threads, args.logins)
+        passwords.PASSWORD_HASHING_POOL.shutdown()
+        print("{:<16} {:>8.1f} logins/s  {:>5} rejected (503)".format(
+            "inline" if pool_workers == 0 else "{} pool workers".format(pool_workers), logins_per_second,
+            rejected_logins))
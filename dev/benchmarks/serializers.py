@@ -0,0 +1,83 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Serializes and encodes the same rows through the generic JSONModel._create_json_model path (getattr + isinstance
+# chain per attribute, then falcon's default JSON handler) and through the compiled JSONSerializer of each model and
+# the JSON media handler of the app.
+#
+#   python dev/benchmarks/serializers.py --rows 10000
+
+import argparse
+import datetime
+import random
+import timeit
+
+import falcon
+from falcon import media
+
+from db.models import User, Match, GenereEnum, RolEnum, PositionEnum, SmashEnum, USER_JSON_MODEL, \
+    USER_NAME_JSON_MODEL, MATCH_JSON_MODEL, compile_json_models
+from media_handlers import JSON_HANDLER
+
+DEFAULT_JSON_HANDLER = media.JSONHandler()
+
+
+def build_users(rows):
+    return [User(id=i, created_at=datetime.datetime(2020, 1, 1, 10, 0, i % 60), username="player{}".format(i),
+                 password="$pbkdf2-sha256$29000$salt$hash", email="player{}@gmail.com".format(i), name="player",
+                 surname=str(i), birthdate=datetime.date(1990, 1, 1 + i % 28), genere=random.choice(list(GenereEnum)),
+                 rol=RolEnum.player, position=random.choice(list(PositionEnum)), phone="660626960",
+                 matchname="pro", prefsmash=random.choice(list(SmashEnum)), club="Club Padel Igualada")
+            for i in range(rows)]
+
+
+def build_matches(users):
+    return [Match(id=i, couple1_p1=users[i % len(users)], couple1_p2=users[(i + 1) % len(users)],
+                  couple2_p1=users[(i + 2) % len(users)], couple2_p2=users[(i + 3) % len(users)], set1="6/3",
+                  set2="6/4", set3="0/0")
+            for i in range(len(users))]
+
+
+# photo_url is not a column and is built the same way by both paths, leave it out to compare the serializers
+USER_ATTRIBUTES = {key: value for key, value in User.JSON_MODEL_ATTRIBUTES.items() if key != "photo"}
+
+
+def generic_user(user):
+    return user.to_json_model(**USER_ATTRIBUTES)
+
+
+def generic_match(match):
+    aux_model = dict()
+    for key, attribute in (("couple1_player1", "couple1_p1"), ("couple1_player2", "couple1_p2"),
+                           ("couple2_player1", "couple2_p1"), ("couple2_player2", "couple2_p2")):
+        aux_model[key] = getattr(match, attribute).to_json_model(id="id", name="name", surname="surname")
+    aux_model.update(match.to_json_model(set1="set1", set2="set2", set3="set3"))
+    return aux_model
+
+
+def run(name, rows, generic, compiled, repeat):
+    def generic_path():
+        return DEFAULT_JSON_HANDLER.serialize([generic(row) for row in rows], falcon.MEDIA_JSON)
+
+    def compiled_path():
+        return JSON_HANDLER.serialize([compiled(row) for row in rows], falcon.MEDIA_JSON)
+
+    assert generic_path() == compiled_path()
+    generic_time = min(timeit.repeat(generic_path, number=1, repeat=repeat))
+    compiled_time = min(timeit.repeat(compiled_path, number=1, repeat=repeat))
+    print("{:<8} generic {:>8.1f} ms   compiled {:>8.1f} ms   x{:.1f}".format(
+        name, generic_time * 1000, compiled_time * 1000, generic_time / compiled_time))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    compile_json_models()
+    users = build_users(args.rows)
+    run("users", users, generic_user, USER_JSON_MODEL.subset(USER_ATTRIBUTES), args.repeat)
+    run("names", users, lambda user: user.to_json_model(id="id", name="name", surname="surname"),
+        USER_NAME_JSON_MODEL, args.repeat)
+    run("matches", build_matches(users), generic_match, MATCH_JSON_MODEL, args.repeat)
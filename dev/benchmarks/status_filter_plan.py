@@ -0,0 +1,91 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Seeds --tournaments tournaments spread over +-5 years, prints the query plan of the status filter of
+# /tournamets/list for each status and checks that open and playing use the status indexes. The seeded rows are
+# removed afterwards.
+#
+#   python dev/benchmarks/status_filter_plan.py --tournaments 100000
+
+import argparse
+import datetime
+import random
+import sys
+import time
+
+from sqlalchemy import text
+
+import db
+from db.models import SQLAlchemyBase, Tournament, Facility, User, TournamentStatusEnum, TournamentTypeEnum, \
+    GenereEnum, RolEnum
+
+SEED_NAME = "status-plan-benchmark"
+
+
+def seed(db_session, count, batch_size=5000):
+    facility = Facility(name=SEED_NAME)
+    owner = User(username=SEED_NAME, email=SEED_NAME, password="-", genere=GenereEnum.male, rol=RolEnum.owner)
+    db_session.add_all([facility, owner])
+    db_session.commit()
+
+    now = datetime.datetime.now()
+    rows = list()
+    for i in range(count):
+        start_register_date = now + datetime.timedelta(days=random.uniform(-5 * 365, 5 * 365))
+        finish_register_date = start_register_date + datetime.timedelta(days=random.randint(7, 30))
+        finish_date = finish_register_date + datetime.timedelta(days=random.randint(1, 30))
+        rows.append({"name": SEED_NAME, "created_at": now, "version": 1, "start_register_date": start_register_date,
+                     "finish_register_date": finish_register_date, "start_date": finish_register_date,
+                     "finish_date": finish_date, "type": TournamentTypeEnum.americana.name, "price_1": 10,
+                     "price_2": 8, "owner_id": owner.id, "facility_id": facility.id})
+        if len(rows) == batch_size:
+            db_session.execute(Tournament.__table__.insert(), rows)
+            rows = list()
+    if len(rows) > 0:
+        db_session.execute(Tournament.__table__.insert(), rows)
+    db_session.commit()
+    return facility, owner
+
+
+def explain(db_session, status):
+    query = db_session.query(Tournament.id).filter(Tournament.status_filter(status))
+    sql = str(query.statement.compile(dialect=db_session.bind.dialect, compile_kwargs={"literal_binds": True}))
+    prefix = "EXPLAIN QUERY PLAN " if db_session.bind.dialect.name == "sqlite" else "EXPLAIN "
+    plan = [" | ".join(str(value) for value in row) for row in db_session.execute(text(prefix + sql))]
+    start = time.perf_counter()
+    rows = len(query.all())
+    return plan, rows, time.perf_counter() - start
+
+
+def main(count):
+    db_session = db.create_db_session()
+    SQLAlchemyBase.metadata.create_all(db_session.bind)
+    print("Seeding {} tournaments...".format(count))
+    facility, owner = seed(db_session, count)
+    try:
+        db_session.execute(text("ANALYZE" if db_session.bind.dialect.name == "sqlite" else "ANALYZE TABLE tournaments"))
+        indexes_used = True
+        for status in TournamentStatusEnum:
+            plan, rows, elapsed = explain(db_session, status)
+            uses_index = any("ix_tournaments_status" in line for line in plan)
+            print("\nstatus={} ({}): {} rows in {:.1f} ms, {}".format(
+                status.value, status.name, rows, elapsed * 1000, "uses status index" if uses_index else "NO INDEX"))
+            for line in plan:
+                print("    " + line)
+            # Most tournaments are closed, so a full scan is the right plan for that one
+            if status != TournamentStatusEnum.closed:
+                indexes_used = indexes_used and uses_index
+        return 0 if indexes_used else 1
+    finally:
+        db_session.query(Tournament).filter(Tournament.facility_id == facility.id).delete(synchronize_session=False)
+        db_session.delete(facility)
+        db_session.delete(owner)
+        db_session.commit()
+        db_session.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tournaments", type=int, default=100000)
+    args = parser.parse_args()
+    sys.exit(main(args.tournaments))
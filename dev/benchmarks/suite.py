@@ -0,0 +1,280 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Times the routes of app.py through falcon's TestClient (no server, no MySQL) on a SQLite database filled by
+# dev/generate_data.py, plus the JSON serializers alone. Every benchmark is repeated for --min-time seconds in each of
+# --rounds rounds, and the lowest median of the rounds (the least disturbed by the rest of the machine) and its p95
+# are written as JSON. With --baseline the medians are compared with a previous run and the exit code is 1 if any of
+# them is more than its threshold slower: --save-baseline stores one per benchmark, NOISE_FACTOR times the spread of
+# the medians of its rounds and never below --threshold, which is used for benchmarks without one. A baseline recorded
+# at another scale (--users, --tournaments, --tokens or --url) is refused. The requests run with the N+1 check of
+# db/lazy_loads.py in --lazy-load-check mode: with "raise" (the default) a route that lazy loads a relationship in a
+# loop answers 500 and the suite stops.
+#
+#   PYTHONPATH=. python dev/benchmarks/suite.py --output /tmp/bench.json --baseline dev/benchmarks/baseline.json
+#   PYTHONPATH=. python dev/benchmarks/suite.py --save-baseline dev/benchmarks/baseline.json
+#
+# Baselines are only comparable on the same machine and scale: record one before a change and compare after it.
+
+import argparse
+import base64
+import datetime
+import gc
+import io
+import itertools
+import json
+import logging
+import math
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+
+DEFAULT_THRESHOLD = 0.25  # 25 % slower than the baseline median
+NOISE_FACTOR = 3  # threshold of a baseline result / spread of its round medians
+
+
+def measure(function, min_time, min_iterations, max_iterations):
+    function()  # warm up: compiled serializers, pool connections, caches of SQLAlchemy
+    timings = list()
+    start = time.perf_counter()
+    while (len(timings) < min_iterations) or ((time.perf_counter() - start < min_time) and
+                                              (len(timings) < max_iterations)):
+        aux_start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - aux_start)
+    timings.sort()
+    return {"median_ms": statistics.median(timings) * 1000,
+            "p95_ms": timings[min(len(timings) - 1, int(len(timings) * 0.95))] * 1000,
+            "iterations": len(timings)}
+
+
+def build_benchmarks(args):
+    # Imported once DAMCore_DB_URL and DAMCore_STATIC_DIRECTORY point to the benchmark database and directory
+    from PIL import Image
+
+    import app
+    import db
+    import hooks
+    from cache import RESULT_CACHES
+    from db.models import User, Tournament, USER_JSON_MODEL, TOURNAMENT_JSON_MODEL
+    from dev.generate_data import generated_token
+    from falcon import testing
+    from media_handlers import JSON_HANDLER
+    from sqlalchemy.orm import selectinload
+
+    client = testing.TestClient(app.app)
+    auth_headers = {"Authorization": generated_token(1)}
+    tokens = [generated_token(user_id) for user_id in range(1, min(args.tokens, args.users) + 1)]
+
+    def get(path, query_string=None, headers=auth_headers, expected=200):
+        def call():
+            result = client.simulate_get(path, query_string=query_string, headers=headers)
+            if result.status_code != expected:
+                raise RuntimeError("GET {}?{}: {} {}".format(path, query_string, result.status, result.text[:200]))
+        return call
+
+    def uncached(function):
+        # The result caches would turn every repetition after the first into a cache hit
+        def call():
+            for result_cache in RESULT_CACHES.values():
+                result_cache.invalidate()
+            function()
+        return call
+
+    def auth_uncached():
+        hooks.AUTH_TOKEN_CACHE.clear()
+        get("/account/profile")()
+
+    token_cycle = itertools.cycle(tokens)
+
+    def auth_many_users():
+        get("/account/profile", headers={"Authorization": next(token_cycle)})()
+
+    # Every login creates a token, so each one uses a user without tokens
+    login_user_ids = itertools.count(len(tokens) + 1)
+
+    def login():
+        credentials = "player{}:{}".format(next(login_user_ids), args.password)
+        result = client.simulate_post("/account/create_token", headers={
+            "Authorization": "Basic " + base64.b64encode(credentials.encode("utf-8")).decode("ascii")})
+        if result.status_code != 200:
+            raise RuntimeError("login: {} {}".format(result.status, result.text[:200]))
+
+    upload_counter = itertools.count()
+
+    def upload():
+        # A different image every time, the same content would be deduplicated
+        aux_count = next(upload_counter)
+        buffer = io.BytesIO()
+        Image.new("RGB", (800, 600), (aux_count % 256, (aux_count // 256) % 256, 128)).save(buffer, "JPEG")
+        body = (b"--BOUNDARY\r\nContent-Disposition: form-data; name=\"image_file\"; filename=\"photo.jpg\"\r\n"
+                b"Content-Type: image/jpeg\r\n\r\n" + buffer.getvalue() + b"\r\n--BOUNDARY--\r\n")
+        result = client.simulate_post("/account/profile/update_profile_image", body=body, headers={
+            "Authorization": tokens[aux_count % len(tokens)], "Content-Type": "multipart/form-data; boundary=BOUNDARY"})
+        if result.status_code != 200:
+            raise RuntimeError("upload: {} {}".format(result.status, result.text[:200]))
+
+    db_session = db.create_db_session()
+    users = db_session.query(User).limit(1000).all()
+    tournaments = db_session.query(Tournament).options(
+        selectinload(Tournament.facility), selectinload(Tournament.categories),
+        selectinload(Tournament.rounds)).limit(100).all()
+
+    def serialize_users():
+        JSON_HANDLER.serialize([USER_JSON_MODEL(user) for user in users], "application/json")
+
+    def serialize_tournaments():
+        # Rounds and matches are loaded on the first run and stay in the session
+        JSON_HANDLER.serialize([TOURNAMENT_JSON_MODEL(tournament) for tournament in tournaments], "application/json")
+
+    benchmarks = [
+        ("auth.cached_token", get("/account/profile")),
+        ("auth.uncached_token", auth_uncached),
+        ("auth.many_users", auth_many_users),
+        ("serialize.users_1000", serialize_users),
+        ("serialize.tournaments_100", serialize_tournaments),
+        ("tournaments.list", uncached(get("/tournamets/list", "limit=20"))),
+        ("tournaments.list_cached", get("/tournamets/list", "limit=20")),
+        ("tournaments.status_open", uncached(get("/tournamets/list", "status=O&limit=20"))),
+        ("tournaments.status_playing", uncached(get("/tournamets/list", "status=G&limit=20"))),
+        ("tournaments.category", uncached(get("/tournamets/list", "genere=F&age=M&limit=20"))),
+        ("tournaments.type_privacy", uncached(get("/tournamets/list", "type=L&inscription_type=C&limit=20"))),
+        ("tournaments.nearby", uncached(get("/tournamets/list", "lat=41.39&lon=2.17&radius_km=10&limit=20"))),
+        ("tournaments.show", get("/tournaments/show/1")),
+        ("users.rol_owner", get("/users", "rol=O")),
+        ("users.club", get("/users", "club=Club%2050")),
+        ("users.club_sparse", get("/users", "club=Club%2050&fields=username,photo")),
+        ("users.show", get("/users/show/player2")),
+        ("account.login", login),
+        ("account.upload_photo", upload),
+    ]
+    return benchmarks, db_session
+
+
+def noise_threshold(result, threshold):
+    # Rounded up to 5 %, so that baselines saved twice on the same machine are easy to compare by eye
+    return max(threshold, math.ceil(NOISE_FACTOR * result["noise"] * 20) / 20)
+
+
+def compare(results, baseline, threshold):
+    regressions = list()
+    print("\n{:<30}{:>14}{:>14}{:>10}  {}".format("benchmark", "baseline (ms)", "median (ms)", "change", ""))
+    for name, result in results.items():
+        aux_baseline = baseline.get(name)
+        if aux_baseline is None:
+            print("{:<30}{:>14}{:>14.3f}{:>10}  new".format(name, "-", result["median_ms"], "-"))
+            continue
+        aux_threshold = aux_baseline.get("threshold", threshold)
+        change = result["median_ms"] / aux_baseline["median_ms"] - 1
+        if change > aux_threshold:
+            status = "REGRESSION"
+            regressions.append(name)
+        elif change < -aux_threshold:
+            status = "faster"
+        else:
+            status = "ok"
+        print("{:<30}{:>14.3f}{:>14.3f}{:>+9.0%}  {}".format(name, aux_baseline["median_ms"], result["median_ms"],
+                                                           change, status))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", help="SQLite database already filled by dev/generate_data.py (skips the seeding)")
+    parser.add_argument("--users", type=int, default=20000)
+    parser.add_argument("--tournaments", type=int, default=2000)
+    parser.add_argument("--tokens", type=int, default=1000)
+    parser.add_argument("--password", default="000000")
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--min-time", type=float, default=0.5, help="seconds each benchmark is repeated per round")
+    parser.add_argument("--min-iterations", type=int, default=5)
+    parser.add_argument("--max-iterations", type=int, default=2000)
+    parser.add_argument("--only", nargs="+", help="benchmarks whose name starts with any of these")
+    parser.add_argument("--output", help="file where the results are written as JSON")
+    parser.add_argument("--baseline", help="results of a previous run to compare with")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    parser.add_argument("--save-baseline", help="write the results as the new baseline to this file")
+    parser.add_argument("--lazy-load-check", choices=("off", "log", "raise"), default="raise")
+    args = parser.parse_args()
+
+    work_directory = tempfile.mkdtemp(prefix="damcore_benchmarks_")
+    database_url = args.url or "sqlite:///{}".format(os.path.join(work_directory, "benchmarks.sqlite"))
+    os.environ["DAMCore_DB_URL"] = database_url
+    os.environ["DAMCore_STATIC_DIRECTORY"] = os.path.join(work_directory, "static")
+    os.environ["DAMCore_LAZY_LOAD_CHECK"] = args.lazy_load_check
+
+    scale = {"users": args.users, "tournaments": args.tournaments, "tokens": args.tokens} if args.url is None \
+        else {"url": args.url}
+    baseline = None
+    if args.baseline is not None:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline.get("scale") != scale:
+            print("{} was recorded at scale {}, this run is {}: run it with the same options or save a new baseline"
+                  .format(args.baseline, baseline.get("scale"), scale))
+            sys.exit(2)
+
+    import db
+    import thumbnails
+    from dev import generate_data
+
+    if args.url is None:
+        generate_data.create_database(db.DB_ENGINE, generate_data.parse_args(
+            ["--users", str(args.users), "--tournaments", str(args.tournaments), "--tokens", str(args.tokens),
+             "--password", args.password]))
+    # Uploads schedule thumbnails faster than the pool generates them
+    logging.getLogger("thumbnails").setLevel(logging.ERROR)
+
+    benchmarks, db_session = build_benchmarks(args)
+    benchmarks = [(name, function) for name, function in benchmarks
+                  if (args.only is None) or any(name.startswith(prefix) for prefix in args.only)]
+    results = dict()
+    round_medians = dict()
+    for round_number in range(1, args.rounds + 1):
+        print("Round {}/{}".format(round_number, args.rounds), flush=True)
+        for name, function in benchmarks:
+            aux_result = measure(function, args.min_time, args.min_iterations, args.max_iterations)
+            # The thumbnails of the uploads would still be generated during the next benchmarks
+            thumbnails.THUMBNAILS_POOL.shutdown()
+            gc.collect()
+            print("  {:<30}{:>10.3f} ms median {:>10.3f} ms p95 {:>7} runs".format(
+                name, aux_result["median_ms"], aux_result["p95_ms"], aux_result["iterations"]), flush=True)
+            round_medians.setdefault(name, list()).append(aux_result["median_ms"])
+            if (name not in results) or (aux_result["median_ms"] < results[name]["median_ms"]):
+                results[name] = aux_result
+    for name, result in results.items():
+        result["noise"] = max(round_medians[name]) / min(round_medians[name]) - 1
+    db_session.close()
+    thumbnails.THUMBNAILS_POOL.shutdown()
+
+    import falcon
+    import sqlalchemy
+    report = {
+        "created_at": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "machine": {"python": platform.python_version(), "platform": platform.platform(),
+                    "processor": platform.processor(), "cpus": os.cpu_count()},
+        "versions": {"falcon": falcon.__version__, "sqlalchemy": sqlalchemy.__version__},
+        "scale": scale,
+        "lazy_load_check": args.lazy_load_check,
+        "results": results,
+    }
+    if args.output is not None:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+    if args.save_baseline is not None:
+        with open(args.save_baseline, "w") as f:
+            json.dump(dict(report, results={name: dict(result, threshold=noise_threshold(result, args.threshold))
+                                            for name, result in results.items()}), f, indent=2, sort_keys=True)
+
+    if baseline is not None:
+        regressions = compare(results, baseline["results"], args.threshold)
+        if len(regressions) > 0:
+            print("\n{} regression(s): {}".format(len(regressions), ", ".join(regressions)))
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
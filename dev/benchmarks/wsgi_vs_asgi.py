@@ -0,0 +1,131 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Starts app.py under gunicorn (sync workers) and asgi.py under uvicorn (one process) on the database configured in
+# settings.py / DAMCore_DB_* and drives both with the same number of concurrent clients doing GET requests. Clients
+# reuse no connections and may wait --client-delay seconds before reading the response, like slow mobile clients.
+#
+#   python dev/benchmarks/wsgi_vs_asgi.py --workers 4 --concurrency 50 200 --duration 20
+
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+
+ROOT_DIRECTORY = os.path.join(os.path.abspath(os.path.dirname(__file__)), "..", "..")
+DEFAULT_TOKEN = "656e50e154865a5dc469b80437ed2f963b8f58c8857b66c9bf"  # player_1 of dev/reset_database.py
+DEFAULT_PATHS = ["/tournamets/list?limit=20", "/tournaments/show/1", "/account/profile"]
+
+
+def start_server(command, port):
+    process = subprocess.Popen(command, cwd=ROOT_DIRECTORY, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            urllib.request.urlopen("http://127.0.0.1:{}/".format(port), timeout=1).read()
+            return process
+        except OSError:
+            if process.poll() is not None:
+                break
+            time.sleep(0.2)
+    process.kill()
+    raise RuntimeError("{} did not start".format(" ".join(command)))
+
+
+def stop_server(process):
+    process.terminate()
+    try:
+        process.wait(10)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+
+async def request(port, path, token, client_delay):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    try:
+        writer.write("GET {} HTTP/1.1\r\nHost: 127.0.0.1:{}\r\nAuthorization: {}\r\nConnection: close\r\n\r\n"
+                     .format(path, port, token).encode("ascii"))
+        await writer.drain()
+        if client_delay > 0:
+            await asyncio.sleep(client_delay)
+        status_line = await reader.readline()
+        await reader.read()
+        return int(status_line.split()[1])
+    finally:
+        writer.close()
+
+
+async def client(port, paths, token, client_delay, deadline, results):
+    index = 0
+    while time.monotonic() < deadline:
+        path = paths[index % len(paths)]
+        index += 1
+        start = time.perf_counter()
+        try:
+            status = await asyncio.wait_for(request(port, path, token, client_delay), 30)
+        except (OSError, asyncio.TimeoutError, ValueError, IndexError):
+            status = None
+        results.append((time.perf_counter() - start, status))
+
+
+async def run_load(port, paths, token, concurrency, duration, client_delay):
+    results = list()
+    deadline = time.monotonic() + duration
+    await asyncio.gather(*[client(port, paths, token, client_delay, deadline, results) for i in range(concurrency)])
+    return results
+
+
+def summarize(results, duration):
+    latencies = sorted(latency for latency, status in results if status is not None and status < 500)
+    errors = len(results) - len(latencies)
+    if len(latencies) == 0:
+        return {"requests_per_second": 0.0, "p50_ms": None, "p95_ms": None, "p99_ms": None, "errors": errors}
+    quantiles = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else [latencies[0]] * 99
+    return {"requests_per_second": len(latencies) / duration, "p50_ms": quantiles[49] * 1000,
+            "p95_ms": quantiles[94] * 1000, "p99_ms": quantiles[98] * 1000, "errors": errors}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, default=4, help="gunicorn sync workers")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[50, 200])
+    parser.add_argument("--duration", type=float, default=20)
+    parser.add_argument("--client-delay", type=float, default=0, help="seconds each client waits before reading")
+    parser.add_argument("--token", default=DEFAULT_TOKEN)
+    parser.add_argument("--paths", nargs="+", default=DEFAULT_PATHS)
+    parser.add_argument("--wsgi-port", type=int, default=8010)
+    parser.add_argument("--asgi-port", type=int, default=8011)
+    args = parser.parse_args()
+
+    servers = [
+        ("wsgi gunicorn x{}".format(args.workers), args.wsgi_port,
+         [sys.executable, "-m", "gunicorn", "-w", str(args.workers), "-b", "127.0.0.1:{}".format(args.wsgi_port),
+          "app:app"]),
+        ("asgi uvicorn x1", args.asgi_port,
+         [sys.executable, "-m", "uvicorn", "asgi:app", "--host", "127.0.0.1", "--port", str(args.asgi_port),
+          "--log-level", "warning"]),
+    ]
+
+    print("{:<22}{:>13}{:>12}{:>12}{:>12}{:>12}{:>9}".format("server", "concurrency", "req/s", "p50 (ms)", "p95 (ms)",
+                                                             "p99 (ms)", "errors"))
+    for name, port, command in servers:
+        process = start_server(command, port)
+        try:
+            for concurrency in args.concurrency:
+                results = asyncio.run(run_load(port, args.paths, args.token, concurrency, args.duration,
+                                               args.client_delay))
+                summary = summarize(results, args.duration)
+                print("{:<22}{:>13}{:>12.1f}{:>12}{:>12}{:>12}{:>9}".format(
+                    name, concurrency, summary["requests_per_second"],
+                    *["-" if summary[key] is None else "{:.1f}".format(summary[key])
+                      for key in ("p50_ms", "p95_ms", "p99_ms")], summary["errors"]))
+        finally:
+            stop_server(process)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,249 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Fills a database with synthetic data at production scale, for load tests and benchmarks. Everything in the database
+# is dropped first, like dev/reset_database.py. Rows are written with Core executemany inserts in batches and every
+# user shares one password hash ("000000" by default), so 200000 users take seconds instead of hours of set_password.
+#
+#   PYTHONPATH=. python dev/generate_data.py --users 200000 --tournaments 20000 --matches-per-round 4
+#   PYTHONPATH=. python dev/generate_data.py --url sqlite:////tmp/damcore_load.sqlite --users 20000
+#
+# Users 1..--tokens get the token generated_token(user_id), e.g. for dev/load_test.py.
+
+import argparse
+import bisect
+import datetime
+import hashlib
+import itertools
+import logging
+import random
+import time
+
+from sqlalchemy import text
+
+import db
+import settings
+from db import geo, migrations
+from db.models import SQLAlchemyBase, User, UserToken, Category, Facility, Tournament, Round, Match, \
+    TournamentCategoriesAssociation, TournamentInscriptionsAssociation, RoundMatchesAssociation, GenereEnum, RolEnum, \
+    PositionEnum, SmashEnum, LicenseEnum, TournamentTypeEnum, TournamentPrivacyTypeEnum, TournamentGenereEnum, \
+    AgeCategoriesTypeEnum
+from db.passwords import hash_password
+
+# LOGGING
+mylogger = logging.getLogger(__name__)
+settings.configure_logging()
+
+# Towns the facilities are spread around: (town, provincia, latitude, longitude, weight)
+TOWNS = [
+    ("Barcelona", "Barcelona", 41.3874, 2.1686, 40), ("Sabadell", "Barcelona", 41.5463, 2.1086, 8),
+    ("Terrassa", "Barcelona", 41.5632, 2.0089, 8), ("Manresa", "Barcelona", 41.7286, 1.8236, 5),
+    ("Igualada", "Barcelona", 41.5789, 1.6171, 4), ("Vic", "Barcelona", 41.9304, 2.2547, 3),
+    ("Girona", "Girona", 41.9794, 2.8214, 8), ("Figueres", "Girona", 42.2664, 2.9614, 3),
+    ("Lleida", "Lleida", 41.6176, 0.6200, 7), ("Tarragona", "Tarragona", 41.1189, 1.2445, 7),
+    ("Reus", "Tarragona", 41.1561, 1.1069, 5), ("Tortosa", "Tarragona", 40.8125, 0.5216, 2),
+]
+TOWN_JITTER = 0.08  # degrees, about 9 km
+WORDS = ["pro", "demon", "tiger", "king", "cobra", "awesome", "moon", "sun", "vibora", "padel", "shoot", "power"]
+POSITIONS = list(PositionEnum)
+SMASHES = list(SmashEnum)
+SET_RESULTS = ["6/0", "6/1", "6/2", "6/3", "6/4", "7/5", "7/6", "4/6", "3/6", "5/7", "6/7"]
+
+
+def generated_token(user_id):
+    return hashlib.sha256("damcore-generated-{}".format(user_id).encode("ascii")).hexdigest()[:50]
+
+
+def zipf_cum_weights(count, exponent=1.1):
+    # A few popular values and a long tail (clubs, facilities, tournament owners)
+    return list(itertools.accumulate(1 / (rank ** exponent) for rank in range(1, count + 1)))
+
+
+def weighted_index(cum_weights):
+    return bisect.bisect(cum_weights, random.random() * cum_weights[-1])
+
+
+def insert_rows(connection, table, rows, batch_size):
+    if hasattr(table, "__table__"):
+        table = table.__table__
+    start = time.perf_counter()
+    count = 0
+    rows = iter(rows)
+    while True:
+        batch = list(itertools.islice(rows, batch_size))
+        if len(batch) == 0:
+            break
+        connection.execute(table.insert(), batch)
+        count += len(batch)
+    mylogger.info("{:<40}{:>10} rows {:>8.1f} s".format(table.name, count, time.perf_counter() - start))
+    return count
+
+
+def user_rows(args, now, clubs_cum_weights, owners):
+    password_hash = hash_password(args.password)
+    first_created_at = now - datetime.timedelta(days=3 * 365)
+    for user_id in range(1, args.users + 1):
+        yield {
+            "id": user_id, "version": 1, "username": "player{}".format(user_id), "password": password_hash,
+            "email": "player{}@gmail.com".format(user_id), "name": "player", "surname": str(user_id),
+            "created_at": first_created_at + datetime.timedelta(seconds=random.randrange(3 * 365 * 86400)),
+            "birthdate": datetime.date(random.randint(1960, 2008), random.randint(1, 12), random.randint(1, 28)),
+            "genere": GenereEnum.male if random.random() < 0.65 else GenereEnum.female,
+            "rol": RolEnum.owner if user_id in owners else RolEnum.player,
+            "position": random.choice(POSITIONS), "phone": "660626960",
+            "license": LicenseEnum.have if random.random() < 0.3 else LicenseEnum.dont,
+            "matchname": random.choice(WORDS) + random.choice(WORDS), "prefsmash": random.choice(SMASHES),
+            # Molts clubs petits i uns quants de grans
+            "club": "Club {}".format(weighted_index(clubs_cum_weights) + 1) if random.random() < 0.9 else None,
+        }
+
+
+def category_rows(levels):
+    category_id = itertools.count(1)
+    for genere in TournamentGenereEnum:
+        for age in AgeCategoriesTypeEnum:
+            for level in range(1, levels + 1):
+                yield {"id": next(category_id), "genere": genere, "age": age, "level": level}
+
+
+def facility_rows(facilities):
+    towns_cum_weights = list(itertools.accumulate(town[4] for town in TOWNS))
+    for facility_id in range(1, facilities + 1):
+        town, provincia, latitude, longitude, weight = TOWNS[weighted_index(towns_cum_weights)]
+        latitude = round(random.gauss(latitude, TOWN_JITTER), 6)
+        longitude = round(random.gauss(longitude, TOWN_JITTER), 6)
+        # Core inserts skip the before_insert listener of Facility
+        yield {"id": facility_id, "name": "Padel {} {}".format(town, facility_id), "latitude": latitude,
+               "longitude": longitude, "geohash": geo.encode_geohash(latitude, longitude), "town": town,
+               "provincia": provincia, "phone": "938000000"}
+
+
+def tournament_rows(args, now, owners, facilities_cum_weights):
+    description = "Lorem ipsum dolor sit amet, consectetur adipiscing elit. " * 8
+    owners_cum_weights = zipf_cum_weights(len(owners))
+    # Dos anys enrere i sis mesos endavant: hi ha tornejos tancats, en joc i oberts
+    first_register_date = now - datetime.timedelta(days=2 * 365)
+    for tournament_id in range(1, args.tournaments + 1):
+        start_register_date = first_register_date + datetime.timedelta(
+            seconds=random.randrange((2 * 365 + 180) * 86400))
+        finish_register_date = start_register_date + datetime.timedelta(days=random.randint(7, 30))
+        start_date = finish_register_date + datetime.timedelta(days=random.randint(1, 7))
+        finish_date = start_date + datetime.timedelta(days=random.choice((1, 2, 3, 7, 14, 60)))
+        yield {
+            "id": tournament_id, "version": 1, "name": "Tournament {}".format(tournament_id),
+            "created_at": start_register_date - datetime.timedelta(days=random.randint(0, 14)),
+            "start_register_date": start_register_date, "finish_register_date": finish_register_date,
+            "start_date": start_date, "finish_date": finish_date, "limit_couples": random.choice((8, 16, 16, 32, 64)),
+            "inscription_type": TournamentPrivacyTypeEnum.privat if random.random() < 0.1
+            else TournamentPrivacyTypeEnum.public,
+            "type": random.choices(list(TournamentTypeEnum), weights=(5, 3, 2))[0],
+            "price_1": random.choice((8, 10, 12, 15, 20, 25)), "price_2": random.choice((5, 8, 10)),
+            "description": description, "owner_id": owners[weighted_index(owners_cum_weights)],
+            "facility_id": weighted_index(facilities_cum_weights) + 1,
+        }
+
+
+def tournament_categories(args, categories):
+    # tournament_id - 1 -> category ids. Mixt senior is by far the most common category
+    category_weights = [4 if category["genere"] == TournamentGenereEnum.mixt else 2 if category["age"] ==
+                        AgeCategoriesTypeEnum.seniors else 1 for category in categories]
+    return [sorted(set(category["id"] for category in random.choices(categories, weights=category_weights,
+                                                                     k=random.choice((1, 1, 2, 3)))))
+            for tournament_id in range(1, args.tournaments + 1)]
+
+
+def inscriptions(args):
+    # tournament_id -> users inscribed, used by the inscriptions and the matches
+    for tournament_id in range(1, args.tournaments + 1):
+        count = min(args.users, max(4, int(random.expovariate(1 / args.inscriptions_per_tournament))))
+        yield tournament_id, random.sample(range(1, args.users + 1), count)
+
+
+def generate(connection, args):
+    now = datetime.datetime.now()
+    random.seed(args.seed)
+
+    owners = sorted(random.sample(range(1, args.users + 1), max(1, args.users // 50)))
+    owners_set = set(owners)
+    insert_rows(connection, User, user_rows(args, now, zipf_cum_weights(args.clubs), owners_set), args.batch_size)
+    insert_rows(connection, UserToken, ({"id": user_id, "token": generated_token(user_id), "user_id": user_id}
+                                        for user_id in range(1, min(args.tokens, args.users) + 1)), args.batch_size)
+
+    categories = list(category_rows(args.category_levels))
+    insert_rows(connection, Category, categories, args.batch_size)
+    insert_rows(connection, Facility, facility_rows(args.facilities), args.batch_size)
+    insert_rows(connection, Tournament, tournament_rows(args, now, owners, zipf_cum_weights(args.facilities)),
+                args.batch_size)
+    aux_tournament_categories = tournament_categories(args, categories)
+    insert_rows(connection, TournamentCategoriesAssociation,
+                ({"tournament_id": tournament_id, "category_id": category_id}
+                 for tournament_id, category_ids in enumerate(aux_tournament_categories, 1)
+                 for category_id in category_ids), args.batch_size)
+
+    # Inscriptions, rounds and matches of the same tournaments are generated together
+    inscription_rows = list()
+    round_rows = list()
+    match_rows = list()
+    round_match_rows = list()
+    round_id = itertools.count(1)
+    match_id = itertools.count(1)
+    for tournament_id, players in inscriptions(args):
+        inscription_rows.extend({"tournament_id": tournament_id, "users_id": user_id} for user_id in players)
+        if len(players) < 4:
+            continue
+        for round_number in range(1, args.rounds_per_tournament + 1):
+            aux_round_id = next(round_id)
+            round_rows.append({"id": aux_round_id, "name": "Round {}".format(round_number),
+                               "category_id": random.choice(aux_tournament_categories[tournament_id - 1]),
+                               "tournament_id": tournament_id})
+            for i in range(args.matches_per_round):
+                aux_match_id = next(match_id)
+                couple1_player1, couple1_player2, couple2_player1, couple2_player2 = random.sample(players, 4)
+                match_rows.append({"id": aux_match_id, "couple1_player1_id": couple1_player1,
+                                   "couple1_player2_id": couple1_player2, "couple2_player1_id": couple2_player1,
+                                   "couple2_player2_id": couple2_player2, "set1": random.choice(SET_RESULTS),
+                                   "set2": random.choice(SET_RESULTS), "set3": "0/0"})
+                round_match_rows.append({"round_id": aux_round_id, "match_id": aux_match_id})
+    insert_rows(connection, TournamentInscriptionsAssociation, inscription_rows, args.batch_size)
+    insert_rows(connection, Round, round_rows, args.batch_size)
+    insert_rows(connection, Match, match_rows, args.batch_size)
+    insert_rows(connection, RoundMatchesAssociation, round_match_rows, args.batch_size)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", help="database to fill, the one of settings.py by default")
+    parser.add_argument("--users", type=int, default=200000)
+    parser.add_argument("--tournaments", type=int, default=20000)
+    parser.add_argument("--facilities", type=int, default=500)
+    parser.add_argument("--clubs", type=int, default=1000)
+    parser.add_argument("--category-levels", type=int, default=3)
+    parser.add_argument("--inscriptions-per-tournament", type=int, default=24, help="mean")
+    parser.add_argument("--rounds-per-tournament", type=int, default=3)
+    parser.add_argument("--matches-per-round", type=int, default=4)
+    parser.add_argument("--tokens", type=int, default=1000, help="users that get a generated_token()")
+    parser.add_argument("--password", default="000000", help="password of every user")
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=0)
+    return parser.parse_args(argv)
+
+
+def create_database(engine, args):
+    start = time.perf_counter()
+    with engine.begin() as connection:
+        mylogger.info("Removing database...")
+        SQLAlchemyBase.metadata.drop_all(connection)
+        connection.execute(text("DROP TABLE IF EXISTS alembic_version"))
+        mylogger.info("Creating database...")
+        migrations.upgrade(connection)
+        generate(connection, args)
+    mylogger.info("Database generated in {:.1f} s".format(time.perf_counter() - start))
+
+
+def main():
+    args = parse_args()
+    create_database(db.DB_ENGINE if args.url is None else db.create_db_engine(args.url), args)
+
+
+if __name__ == "__main__":
+    main()
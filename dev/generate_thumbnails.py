@@ -0,0 +1,47 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Generates the thumbnails missing for the profile photos and tournament posters already stored, e.g. the ones
+# uploaded before thumbnails.py existed or skipped because the pool was saturated.
+#
+#   PYTHONPATH=. python dev/generate_thumbnails.py
+
+import logging
+import os
+
+import db
+import settings
+import thumbnails
+from db.models import User, Tournament
+
+# LOGGING
+mylogger = logging.getLogger(__name__)
+settings.configure_logging()
+
+
+def generate_missing(db_session, model_class, attribute_name):
+    thumbnails_column = getattr(model_class, attribute_name + "_thumbnails")
+    aux_instances = db_session.query(model_class).filter(getattr(model_class, attribute_name).isnot(None),
+                                                         thumbnails_column.is_(None)).all()
+    for aux_instance in aux_instances:
+        directory = getattr(aux_instance, attribute_name + "_path")
+        filename = getattr(aux_instance, attribute_name)
+        if not os.path.exists(os.path.join(directory, filename)):
+            mylogger.warning("{} not found".format(os.path.join(directory, filename)))
+            continue
+        try:
+            sizes = thumbnails.generate_thumbnails(directory, filename, settings.THUMBNAIL_SIZES,
+                                                   settings.THUMBNAIL_FORMATS, settings.THUMBNAIL_QUALITY)
+        except Exception as e:
+            mylogger.error("Error generating the thumbnails of {}: {}".format(filename, e))
+            continue
+        setattr(aux_instance, attribute_name + "_thumbnails", sizes)
+        db_session.commit()
+    return len(aux_instances)
+
+
+if __name__ == "__main__":
+    db_session = db.create_db_session()
+    mylogger.info("Users: {}".format(generate_missing(db_session, User, "photo")))
+    mylogger.info("Tournaments: {}".format(generate_missing(db_session, Tournament, "poster")))
+    db_session.close()
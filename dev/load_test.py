@@ -0,0 +1,242 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Simulates --clients concurrent mobile clients against app.py under gunicorn, started here with --workers and
+# --threads (or against --target, a server already running). Every client logs in through /account/create_token,
+# then until --duration ends pages through /tournamets/list with random filters, opens some of the tournaments and
+# polls /account/profile (with If-None-Match, like the app), waiting --think-time seconds on average between requests.
+# It logs out (/account/delete_token) at the end. Latency percentiles, throughput and error rate are reported per
+# route. The same --seed and options replay the same requests.
+#
+# Needs users with the password of dev/generate_data.py; client i logs in as player<--first-user + i>:
+#
+#   PYTHONPATH=. python dev/generate_data.py --users 200000 --tournaments 20000
+#   PYTHONPATH=. python dev/load_test.py --clients 200 --workers 4 --threads 4 --duration 60 --output /tmp/load.json
+
+import argparse
+import asyncio
+import base64
+import json
+import random
+import statistics
+import sys
+import time
+import urllib.parse
+
+from dev.benchmarks.wsgi_vs_asgi import start_server, stop_server
+
+LIST_FILTERS = [
+    {}, {}, {"status": "O"}, {"status": "O"}, {"status": "G"}, {"genere": "X"}, {"genere": "F"}, {"age": "M"},
+    {"type": "L"}, {"inscription_type": "O", "status": "O"},
+    {"lat": "41.39", "lon": "2.17", "radius_km": "10"}, {"lat": "41.98", "lon": "2.82", "radius_km": "25"},
+]
+ACCEPTED_STATUSES = (200, 304)
+
+
+class RouteStats(object):
+    def __init__(self):
+        self.latencies = list()
+        self.statuses = dict()
+        self.errors = 0
+
+    def add(self, latency, status):
+        self.latencies.append(latency)
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+        if status not in ACCEPTED_STATUSES:
+            self.errors += 1
+
+    def summary(self, duration):
+        aux_latencies = sorted(self.latencies)
+        quantiles = statistics.quantiles(aux_latencies, n=100) if len(aux_latencies) > 1 \
+            else aux_latencies * 99
+        return {"requests": len(aux_latencies), "requests_per_second": len(aux_latencies) / duration,
+                "p50_ms": quantiles[49] * 1000, "p95_ms": quantiles[94] * 1000, "p99_ms": quantiles[98] * 1000,
+                "error_rate": self.errors / len(aux_latencies),
+                "statuses": {str(status): count for status, count in sorted(self.statuses.items(), key=str)}}
+
+
+def _decode_chunked(body):
+    aux_body = b""
+    while body:
+        size_line, body = body.split(b"\r\n", 1)
+        size = int(size_line.split(b";")[0], 16)
+        if size == 0:
+            break
+        aux_body += body[:size]
+        body = body[size + 2:]
+    return aux_body
+
+
+async def http_request(host, port, method, path, headers, body=b"", timeout=30):
+    # One connection per request (gunicorn sync workers close it anyway). Returns (status, headers, body)
+    reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout)
+    try:
+        aux_headers = dict(headers, Host="{}:{}".format(host, port), Connection="close")
+        if body:
+            aux_headers["Content-Length"] = str(len(body))
+        writer.write("{} {} HTTP/1.1\r\n{}\r\n".format(method, path, "".join(
+            "{}: {}\r\n".format(key, value) for key, value in aux_headers.items())).encode("latin-1") + body)
+        await writer.drain()
+        raw_response = await asyncio.wait_for(reader.read(), timeout)
+    finally:
+        writer.close()
+    raw_headers, response_body = raw_response.split(b"\r\n\r\n", 1)
+    header_lines = raw_headers.decode("latin-1").split("\r\n")
+    response_headers = {line.split(":", 1)[0].strip().lower(): line.split(":", 1)[1].strip()
+                        for line in header_lines[1:] if ":" in line}
+    if response_headers.get("transfer-encoding") == "chunked":
+        response_body = _decode_chunked(response_body)
+    return int(header_lines[0].split()[1]), response_headers, response_body
+
+
+class MobileClient(object):
+    def __init__(self, args, index, stats):
+        self.args = args
+        self.username = "player{}".format(args.first_user + index)
+        self.random = random.Random("{}-{}".format(args.seed, index))
+        self.stats = stats
+        self.token = None
+        self.etags = dict()
+
+    async def request(self, route, method, path, headers=None, body=b"", etag_key=None):
+        aux_headers = dict(headers or {})
+        if self.token is not None:
+            aux_headers["Authorization"] = self.token
+        if (etag_key is not None) and (etag_key in self.etags):
+            aux_headers["If-None-Match"] = self.etags[etag_key]
+        start = time.perf_counter()
+        try:
+            status, response_headers, response_body = await http_request(
+                self.args.host, self.args.port, method, path, aux_headers, body)
+        except (OSError, asyncio.TimeoutError, ValueError, IndexError):
+            status, response_headers, response_body = None, dict(), b""
+        self.stats.setdefault(route, RouteStats()).add(time.perf_counter() - start, status)
+        if (etag_key is not None) and ("etag" in response_headers):
+            self.etags[etag_key] = response_headers["etag"]
+        return status, response_headers, response_body
+
+    async def think(self):
+        if self.args.think_time > 0:
+            await asyncio.sleep(self.random.expovariate(1 / self.args.think_time))
+
+    async def login(self):
+        credentials = "{}:{}".format(self.username, self.args.password)
+        status, headers, body = await self.request("POST /account/create_token", "POST", "/account/create_token", {
+            "Authorization": "Basic " + base64.b64encode(credentials.encode("utf-8")).decode("ascii")})
+        if status == 200:
+            self.token = json.loads(body)["token"]
+        return self.token is not None
+
+    async def logout(self):
+        await self.request("POST /account/delete_token", "POST", "/account/delete_token",
+                           {"Content-Type": "application/json"}, json.dumps({"token": self.token}).encode("utf-8"))
+
+    async def browse_tournaments(self):
+        params = dict(self.random.choice(LIST_FILTERS), limit=str(self.args.page_size))
+        tournament_ids = list()
+        for page in range(self.random.randint(1, self.args.max_pages)):
+            status, headers, body = await self.request(
+                "GET /tournamets/list", "GET", "/tournamets/list?" + urllib.parse.urlencode(params))
+            if status != 200:
+                return
+            tournament_ids.extend(tournament["id"] for tournament in json.loads(body))
+            await self.think()
+            if ("x-next-cursor" not in headers) or ("lat" in params):
+                break
+            params["cursor"] = headers["x-next-cursor"]
+
+        for tournament_id in self.random.sample(tournament_ids, min(len(tournament_ids), self.random.randint(0, 2))):
+            await self.request("GET /tournaments/show/{id}", "GET", "/tournaments/show/{}".format(tournament_id),
+                               etag_key=tournament_id)
+            await self.think()
+
+    async def poll_profile(self):
+        await self.request("GET /account/profile", "GET", "/account/profile", etag_key="profile")
+        await self.think()
+
+    async def run(self, start_delay, deadline):
+        await asyncio.sleep(start_delay)
+        if not await self.login():
+            return
+        await self.think()
+        while time.monotonic() < deadline:
+            if self.random.random() < self.args.profile_ratio:
+                await self.poll_profile()
+            else:
+                await self.browse_tournaments()
+        await self.logout()
+
+
+async def run_load(args):
+    stats = dict()
+    start = time.monotonic()
+    deadline = start + args.duration
+    await asyncio.gather(*[MobileClient(args, index, stats).run(args.ramp_up * index / args.clients, deadline)
+                           for index in range(args.clients)])
+    return stats, time.monotonic() - start
+
+
+def report(stats, duration):
+    summaries = {route: route_stats.summary(duration) for route, route_stats in sorted(stats.items())}
+    total = RouteStats()
+    for route_stats in stats.values():
+        total.latencies.extend(route_stats.latencies)
+        total.errors += route_stats.errors
+        for status, count in route_stats.statuses.items():
+            total.statuses[status] = total.statuses.get(status, 0) + count
+    if len(total.latencies) > 0:
+        summaries["total"] = total.summary(duration)
+
+    print("\n{:<32}{:>9}{:>9}{:>10}{:>10}{:>10}{:>8}".format("route", "requests", "req/s", "p50 (ms)", "p95 (ms)",
+                                                           "p99 (ms)", "errors"))
+    for route, summary in summaries.items():
+        print("{:<32}{:>9}{:>9.1f}{:>10.1f}{:>10.1f}{:>10.1f}{:>7.1%}".format(
+            route, summary["requests"], summary["requests_per_second"], summary["p50_ms"], summary["p95_ms"],
+            summary["p99_ms"], summary["error_rate"]))
+    return summaries
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clients", type=int, default=50)
+    parser.add_argument("--duration", type=float, default=60, help="seconds")
+    parser.add_argument("--ramp-up", type=float, default=10, help="seconds until every client has started")
+    parser.add_argument("--think-time", type=float, default=1, help="mean seconds between requests of a client")
+    parser.add_argument("--profile-ratio", type=float, default=0.3, help="share of actions that poll the profile")
+    parser.add_argument("--page-size", type=int, default=20)
+    parser.add_argument("--max-pages", type=int, default=3)
+    parser.add_argument("--first-user", type=int, default=1001, help="client i logs in as player<first-user + i>")
+    parser.add_argument("--password", default="000000")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--target", help="host:port of a running server, instead of starting gunicorn")
+    parser.add_argument("--workers", type=int, default=4, help="gunicorn workers")
+    parser.add_argument("--threads", type=int, default=1, help="threads per gunicorn worker")
+    parser.add_argument("--port", type=int, default=8020)
+    parser.add_argument("--output", help="file where the report is written as JSON")
+    args = parser.parse_args()
+
+    server = None
+    if args.target is not None:
+        args.host, args.port = args.target.rsplit(":", 1)
+        args.port = int(args.port)
+    else:
+        args.host = "127.0.0.1"
+        # gunicorn.conf.py (post_fork) is loaded from the working directory
+        server = start_server([sys.executable, "-m", "gunicorn", "-w", str(args.workers), "--threads",
+                               str(args.threads), "-b", "{}:{}".format(args.host, args.port), "app:app"], args.port)
+    try:
+        print("{} clients for {:.0f} s against {}:{}".format(args.clients, args.duration, args.host, args.port))
+        stats, duration = asyncio.run(run_load(args))
+    finally:
+        if server is not None:
+            stop_server(server)
+
+    summaries = report(stats, duration)
+    if args.output is not None:
+        with open(args.output, "w") as f:
+            json.dump({"options": {key: value for key, value in vars(args).items() if key != "password"},
+                       "duration": duration, "routes": summaries}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
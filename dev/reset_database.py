@@ -10,6 +10,7 @@ from sqlalchemy.sql import text
 
 import db
 import settings
+from db import migrations
 from db.models import SQLAlchemyBase, User, GenereEnum, UserToken, RolEnum, PositionEnum, SmashEnum, TournamentTypeEnum, \
     TournamentPrivacyTypeEnum, Facility, TournamentGenereEnum, AgeCategoriesTypeEnum, Category, Tournament, Couple, \
     Round, Match
@@ -37,8 +38,10 @@ if __name__ == "__main__":
     # -------------------- REMOVE AND CREATE TABLES --------------------
     mylogger.info("Removing database...")
     SQLAlchemyBase.metadata.drop_all(db.DB_ENGINE)
+    with db.DB_ENGINE.begin() as connection:
+        connection.execute(text("DROP TABLE IF EXISTS alembic_version"))
     mylogger.info("Creating database...")
-    SQLAlchemyBase.metadata.create_all(db.DB_ENGINE)
+    migrations.upgrade()
 
 
 
@@ -0,0 +1,28 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# gunicorn reads this file from the working directory (docker/backend/start.sh runs it from /app). Every worker holds
+# its own connection pool, so workers * (DB_POOL_SIZE + DB_POOL_MAX_OVERFLOW) must fit in MySQL max_connections.
+
+import os
+import shutil
+import tempfile
+
+# The workers write their metrics to files of this directory and /metrics adds them up (metrics.py). It has to be in
+# the environment before prometheus_client is imported
+os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", os.path.join(tempfile.gettempdir(), "damcore_metrics"))
+
+
+# noinspection PyUnusedLocal
+def on_starting(server):
+    # Files left by a previous run would be added to the new values
+    shutil.rmtree(os.environ["PROMETHEUS_MULTIPROC_DIR"], ignore_errors=True)
+    os.makedirs(os.environ["PROMETHEUS_MULTIPROC_DIR"])
+
+
+# noinspection PyUnusedLocal
+def post_fork(server, worker):
+    # With preload_app the engine is created in the master and inherited by the workers
+    import db
+    db.reset_engine_after_fork()
+
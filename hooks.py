@@ -2,24 +2,97 @@
 # -*- coding: utf-8 -*-
 
 import logging
+import time
 
 import falcon
+from sqlalchemy import inspect
+from sqlalchemy.orm import joinedload, make_transient_to_detached
 
+import db
 import messages
-from db.models import UserToken
+import settings
+from cache import LRUTTLCache, RevocationLog
+from db.models import User, UserToken
 
 mylogger = logging.getLogger(__name__)
 
+# token -> (time it was read, token columns, user columns). Every gunicorn worker keeps its own copy: deleting a token
+# or updating a user is also written to AUTH_REVOCATIONS, and a cached entry read before that is not used any more.
+AUTH_TOKEN_CACHE = LRUTTLCache(settings.AUTH_TOKEN_CACHE_SIZE, settings.AUTH_TOKEN_CACHE_TTL)
+AUTH_REVOCATIONS = RevocationLog(settings.AUTH_REVOCATIONS_SQLITE_PATH, settings.AUTH_TOKEN_CACHE_TTL)
+
+
+def _snapshot_instance(instance):
+    return {attribute.key: getattr(instance, attribute.key) for attribute in inspect(instance).mapper.column_attrs}
+
+
+def _restore_instance(db_session, model_class, snapshot):
+    # Attach a copy of the cached row to the session as if it had been loaded from the database, without any SELECT
+    aux_instance = model_class(**snapshot)
+    make_transient_to_detached(aux_instance)
+    db_session.add(aux_instance)
+    return aux_instance
+
+
+def _token_revocation_key(auth_token):
+    return "token:{}".format(auth_token)
+
+
+def _user_revocation_key(user_id):
+    return "user:{}".format(user_id)
+
+
+def invalidate_auth_token(auth_token):
+    AUTH_TOKEN_CACHE.delete(auth_token)
+    AUTH_REVOCATIONS.revoke(_token_revocation_key(auth_token))
+
+
+def invalidate_auth_user(user_id):
+    AUTH_TOKEN_CACHE.delete_where(lambda auth_token, cached: cached[2]["id"] == user_id)
+    AUTH_REVOCATIONS.revoke(_user_revocation_key(user_id))
+
+
+def _cached_token(auth_token):
+    cached_token = AUTH_TOKEN_CACHE.get(auth_token)
+    if cached_token is None:
+        return None
+    read_at, token_snapshot, user_snapshot = cached_token
+    if AUTH_REVOCATIONS.revoked_since((_token_revocation_key(auth_token), _user_revocation_key(user_snapshot["id"])),
+                                      read_at):
+        # Deleted or changed through another worker
+        AUTH_TOKEN_CACHE.delete(auth_token)
+        return None
+    return token_snapshot, user_snapshot
+
+
+def _query_token(db_session, auth_token):
+    return db_session.query(UserToken).options(joinedload(UserToken.user)) \
+        .filter(UserToken.token == auth_token).one_or_none()
+
 
 # noinspection PyUnusedLocal
 def requires_auth(req, resp, resource, params):
     auth_token = req.get_header("Authorization")
     if auth_token is not None:
-        current_token = resource.db_session.query(UserToken).filter(UserToken.token == auth_token).one_or_none()
-        if current_token is not None:
-            req.context["auth_user_token"] = current_token
-            req.context["auth_user"] = current_token.user
+        db_session = req.context["db_session"]
+        cached_token = _cached_token(auth_token)
+        if cached_token is not None:
+            current_user = _restore_instance(db_session, User, cached_token[1])
+            current_token = _restore_instance(db_session, UserToken, cached_token[0])
         else:
-            raise falcon.HTTPUnauthorized(description=messages.token_invalid)
+            # Before the query: a revocation committed while it runs makes the entry stale
+            aux_read_at = time.time()
+            current_token = _query_token(db_session, auth_token)
+            if (current_token is None) and db.stick_to_primary(db_session):
+                # A token just created on the primary may not have reached the replica yet
+                current_token = _query_token(db_session, auth_token)
+            if current_token is None:
+                raise falcon.HTTPUnauthorized(description=messages.token_invalid)
+            current_user = current_token.user
+            AUTH_TOKEN_CACHE.set(auth_token, (aux_read_at, _snapshot_instance(current_token),
+                                              _snapshot_instance(current_user)))
+
+        req.context["auth_user_token"] = current_token
+        req.context["auth_user"] = current_user
     else:
         raise falcon.HTTPUnauthorized(description=messages.token_required)
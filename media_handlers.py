@@ -0,0 +1,54 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+import datetime
+import enum
+import json
+import logging
+from functools import partial
+
+from falcon import media
+
+import settings
+
+mylogger = logging.getLogger(__name__)
+
+
+def _encode_value(value):
+    # Same formats the models used to apply by hand before building resp.media
+    if isinstance(value, datetime.datetime):
+        return value.strftime(settings.DATETIME_DEFAULT_FORMAT)
+    elif isinstance(value, datetime.date):
+        return value.strftime(settings.DATE_DEFAULT_FORMAT)
+    elif isinstance(value, datetime.time):
+        return value.strftime(settings.TIME_DEFAULT_FORMAT)
+    elif isinstance(value, enum.Enum):
+        return value.value
+    raise TypeError("Object of type {} is not JSON serializable".format(type(value).__name__))
+
+
+class DAMCoreJSONEncoder(json.JSONEncoder):
+    def default(self, o):
+        return _encode_value(o)
+
+
+def create_json_handler(backend=None):
+    """JSON media handler that encodes datetimes and enums itself.
+
+    "json" (default) uses the stdlib C encoder and writes exactly what falcon's default handler wrote for the
+    pre-formatted models. "orjson" is faster but uses compact separators, so the output is not byte-for-byte the same;
+    it falls back to the stdlib when orjson is not installed.
+    """
+    backend = backend or settings.JSON_BACKEND
+    if backend == "orjson":
+        try:
+            import orjson
+            return media.JSONHandler(dumps=partial(orjson.dumps, default=_encode_value,
+                                                   option=orjson.OPT_PASSTHROUGH_DATETIME),
+                                     loads=orjson.loads)
+        except ImportError:
+            mylogger.warning("orjson is not installed, using the stdlib JSON encoder")
+    return media.JSONHandler(dumps=DAMCoreJSONEncoder(ensure_ascii=False).encode)
+
+
+JSON_HANDLER = create_json_handler()
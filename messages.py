@@ -6,8 +6,10 @@ import gettext
 _ = gettext.gettext
 age_invalid = _("Invalid Age")
 authorization_header_required = _("Authorization header required")
+cursor_invalid = _("Invalid cursor")
 error_saving_user_token = _("Error when saving the user token")
 error_removing_user_token = _("Error removing the user token")
+fields_invalid = _("Invalid fields")
 genere_invalid = _("Invalid genere")
 inscription_type_invalid = _("Invalid inscription_type")
 position_invalid = _("Invalid position")
@@ -15,9 +17,14 @@ rol_invalid = _("Invalid rol")
 prefsmash_not_found = _("This PREFSMASH Wasn't Found")
 maximum_tokens_exceded = _("The user has reached the maximum number of tokens allowed")
 parameters_invalid = _("Invalid parameters")
+proximity_coordinates_required = _("Both lat and lon are required")
+proximity_pagination_invalid = _("Cursor and stream can't be used with a proximity search")
 quota_exceded = _("Quota exceded")
 resource_not_found = _("Resource not found")
 type_invalid = _("Invalid Type")
+upload_too_large = _("The file is too large")
+server_busy = _("The server is busy, try again later")
+status_invalid = _("Invalid status")
 token_doesnt_belongs_current_user = _("This token doesn't belongs to the current user")
 token_invalid = _("Invalid token")
 token_not_found = _("Token not found")
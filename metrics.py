@@ -0,0 +1,113 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Prometheus metrics of the requests, exposed at /metrics. Under gunicorn every worker writes its values to files in
+# PROMETHEUS_MULTIPROC_DIR (set by gunicorn.conf.py) and /metrics adds up the files of all the workers; without it
+# (a single process: falcon's TestClient, uvicorn) the values live in memory.
+
+import contextvars
+import logging
+import os
+import time
+
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, REGISTRY, \
+    generate_latest
+from prometheus_client import multiprocess
+from sqlalchemy import event
+
+mylogger = logging.getLogger(__name__)
+
+UNMATCHED_ROUTE = "unmatched"  # 404s of the sink, a label per unknown path would never end
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)  # seconds
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)  # bytes
+SQL_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 200)  # statements per request
+
+REQUESTS = Counter("damcore_requests_total", "Requests answered", ["method", "route", "status"])
+REQUEST_LATENCY = Histogram("damcore_request_duration_seconds", "Time from the first middleware to the response",
+                            ["method", "route"], buckets=LATENCY_BUCKETS)
+RESPONSE_SIZE = Histogram("damcore_response_size_bytes", "Size of the response body (streamed ones excluded)",
+                          ["method", "route"], buckets=SIZE_BUCKETS)
+SQL_STATEMENTS = Histogram("damcore_request_sql_statements", "SQL statements executed by a request",
+                           ["method", "route"], buckets=SQL_COUNT_BUCKETS)
+SQL_DURATION = Histogram("damcore_request_sql_duration_seconds", "Time a request waited for its SQL statements",
+                         ["method", "route"], buckets=LATENCY_BUCKETS)
+
+# Connection pools (db/pool.py), by pool: "primary", "replica<n>" or "async". /stats/pool only shows the worker that
+# answers, these add up the workers alive
+DB_POOL_CHECKED_OUT = Gauge("damcore_db_pool_checked_out", "Connections in use", ["pool"],
+                            multiprocess_mode="livesum")
+DB_POOL_OVERFLOW = Gauge("damcore_db_pool_overflow", "Connections open above the pool size", ["pool"],
+                         multiprocess_mode="livesum")
+DB_POOL_WAIT = Histogram("damcore_db_pool_wait_seconds", "Time waited for a free connection", ["pool"],
+                         buckets=LATENCY_BUCKETS)
+DB_POOL_WAIT_MAX = Gauge("damcore_db_pool_wait_max_seconds", "Longest wait for a free connection of a worker",
+                         ["pool"], multiprocess_mode="livemax")
+DB_POOL_TIMEOUTS = Counter("damcore_db_pool_timeouts_total", "Checkouts that gave up after DB_POOL_TIMEOUT", ["pool"])
+
+# Metrics of the request being handled. The object itself is mutable: asgi.py runs the responders in a copy of the
+# context, and the statements executed there have to be added to the same object
+CURRENT_REQUEST = contextvars.ContextVar("current_request_metrics", default=None)
+
+
+class RequestMetrics(object):
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.sql_statements = 0
+        self.sql_time = 0.0
+
+
+def start_request():
+    return CURRENT_REQUEST.set(RequestMetrics())
+
+
+def finish_request(token, method, route, status, size):
+    request_metrics = CURRENT_REQUEST.get()
+    CURRENT_REQUEST.reset(token)
+    if request_metrics is None:
+        return
+    aux_route = route if route is not None else UNMATCHED_ROUTE
+    REQUESTS.labels(method, aux_route, status).inc()
+    REQUEST_LATENCY.labels(method, aux_route).observe(time.perf_counter() - request_metrics.start)
+    if size is not None:
+        RESPONSE_SIZE.labels(method, aux_route).observe(size)
+    SQL_STATEMENTS.labels(method, aux_route).observe(request_metrics.sql_statements)
+    SQL_DURATION.labels(method, aux_route).observe(request_metrics.sql_time)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context.metrics_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # Statements outside a request (scripts, thumbnails.py callbacks) are not counted
+    request_metrics = CURRENT_REQUEST.get()
+    if request_metrics is not None:
+        request_metrics.sql_statements += 1
+        request_metrics.sql_time += time.perf_counter() - context.metrics_start
+
+
+def observe_pool_checkout(pool_name, wait_time, wait_time_max, timed_out):
+    DB_POOL_WAIT.labels(pool_name).observe(wait_time)
+    DB_POOL_WAIT_MAX.labels(pool_name).set(wait_time_max)
+    if timed_out:
+        DB_POOL_TIMEOUTS.labels(pool_name).inc()
+
+
+def set_pool_usage(pool_name, checked_out, overflow):
+    DB_POOL_CHECKED_OUT.labels(pool_name).set(checked_out)
+    DB_POOL_OVERFLOW.labels(pool_name).set(overflow)
+
+
+def install_sql_metrics(engine):
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def render():
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
@@ -3,38 +3,116 @@
 
 import gettext
 import logging
+import threading
+
+import falcon
 
 import db
+import metrics
 import settings
+from db import lazy_loads
 
 mylogger = logging.getLogger(__name__)
 
+READ_ONLY_METHODS = ("GET", "HEAD")
+
 
 # noinspection PyMethodMayBeStatic,PyUnusedLocal
 class DBSessionManager(object):
-    def __init__(self):
-        self.db_factory = db.DB_SCOPED_SESSION_FACTORY
+    # The session lives in req.context, never on the resource instances: they are shared by all the requests (and
+    # threads) of the worker. GET and HEAD only read, their queries can go to the replicas (db.RoutingSession)
+    def process_request(self, req, resp):
+        req.context["db_session"] = db.LazyDBSession(read_only=req.method in READ_ONLY_METHODS)
+
+    def process_response(self, req, resp, resource, req_succeeded):
+        db_session = req.context.get("db_session")
+        if db_session is not None:
+            # Whatever a failed request left uncommitted is discarded before the connection goes back to the pool
+            db_session.close(rollback=not req_succeeded)
+
 
-    def process_resource(self, req, resp, resource, params):
-        resource.db_session = db.create_db_session()
+# noinspection PyMethodMayBeStatic,PyUnusedLocal
+class RequestMetricsRecorder(object):
+    # First middleware of the app: its process_response is the last one, so the latency includes the others (e.g. the
+    # session close of DBSessionManager). The route is the URI template, not the path, to keep the labels bounded
+    def process_request(self, req, resp):
+        req.context["metrics_token"] = metrics.start_request()
 
     def process_response(self, req, resp, resource, req_succeeded):
-        if (resource is not None) and (resource.db_session is not None):
-            resource.db_session.close()
+        if "metrics_token" in req.context:
+            self._finish(req, resp, len(resp.render_body() or b"") if resp.stream is None else None)
+
+    def _finish(self, req, resp, size):
+        metrics.finish_request(req.context.pop("metrics_token"), req.method, req.uri_template,
+                               str(falcon.http_status_to_code(resp.status)), size)
+
+    # falcon.asgi (asgi.py) awaits these instead
+    async def process_request_async(self, req, resp):
+        self.process_request(req, resp)
+
+    async def process_response_async(self, req, resp, resource, req_succeeded):
+        if "metrics_token" in req.context:
+            self._finish(req, resp, len(await resp.render_body() or b"") if resp.stream is None else None)
+
+
+# noinspection PyMethodMayBeStatic,PyUnusedLocal
+class LazyLoadChecker(object):
+    # Scope of the N+1 check of db/lazy_loads.py, it does nothing with DAMCore_LAZY_LOAD_CHECK=off
+    def process_request(self, req, resp):
+        req.context["lazy_loads_token"] = lazy_loads.start_request()
+
+    def process_response(self, req, resp, resource, req_succeeded):
+        if "lazy_loads_token" in req.context:
+            lazy_loads.finish_request(req.context.pop("lazy_loads_token"))
+
+    # falcon.asgi (asgi.py) awaits these instead
+    async def process_request_async(self, req, resp):
+        self.process_request(req, resp)
+
+    async def process_response_async(self, req, resp, resource, req_succeeded):
+        self.process_response(req, resp, resource, req_succeeded)
 
 
 # noinspection PyMethodMayBeStatic,PyUnusedLocal
 class Falconi18n(object):
+    def __init__(self):
+        # Compiled catalogs, loaded from disk once per locale
+        self._translations = {settings.DEFAULT_LANGUAGE: gettext.NullTranslations()}
+        self._translations_lock = threading.Lock()
+
+    def _get_translation(self, language):
+        aux_translation = self._translations.get(language)
+        if aux_translation is None:
+            with self._translations_lock:
+                aux_translation = self._translations.get(language)
+                if aux_translation is None:
+                    mylogger.debug("Loading {} catalog".format(language))
+                    aux_translation = gettext.translation(settings.LOCALE_DOMAIN,
+                                                          localedir=settings.LOCALE_DIRECTORY,
+                                                          languages=[language], fallback=True)
+                    self._translations[language] = aux_translation
+        return aux_translation
+
     def process_request(self, req, resp):
-        locale = None
         request_language = req.get_header("Accept-Language")
         if (request_language in settings.ACCEPTED_LANGUAGES) and (request_language != settings.DEFAULT_LANGUAGE):
             mylogger.debug("Setting language to: {}".format(settings.ACCEPTED_LANGUAGES[request_language]))
-            locale = gettext.translation(settings.LOCALE_DOMAIN, localedir=settings.LOCALE_DIRECTORY,
-                                         languages=[settings.ACCEPTED_LANGUAGES[request_language]])
-            settings.CURRENT_LANGUAGE = settings.ACCEPTED_LANGUAGES[request_language]
+            language = settings.ACCEPTED_LANGUAGES[request_language]
         else:
-            locale = gettext.NullTranslations()
-            settings.CURRENT_LANGUAGE = settings.DEFAULT_LANGUAGE
+            language = settings.DEFAULT_LANGUAGE
+
+        # The locale lives in the request (and the context of the thread handling it), never in a module global
+        req.context["language"] = language
+        req.context["gettext"] = self._get_translation(language).gettext
+        req.context["language_token"] = settings.set_current_language(language)
+
+    def process_response(self, req, resp, resource, req_succeeded):
+        if "language_token" in req.context:
+            settings.reset_current_language(req.context["language_token"])
+
+    # falcon.asgi (asgi.py) awaits these instead
+    async def process_request_async(self, req, resp):
+        self.process_request(req, resp)
 
-        locale.install()
+    async def process_response_async(self, req, resp, resource, req_succeeded):
+        self.process_response(req, resp, resource, req_succeeded)
@@ -0,0 +1,45 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+from alembic import context
+
+import db
+import settings
+from db.models import SQLAlchemyBase
+
+config = context.config
+if config.attributes.get("configure_logging", True):
+    settings.configure_logging()
+
+target_metadata = SQLAlchemyBase.metadata
+
+
+def run_migrations_offline():
+    context.configure(url=db.DB_ENGINE.url, target_metadata=target_metadata, literal_binds=True,
+                      dialect_opts={"paramstyle": "named"})
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online():
+    # Scripts (reset_database, benchmarks) can pass their own connection in config.attributes["connection"]
+    connection = config.attributes.get("connection")
+    if connection is None:
+        with db.DB_ENGINE.connect() as connection:
+            _run_migrations(connection)
+    else:
+        _run_migrations(connection)
+
+
+def _run_migrations(connection):
+    # SQLite can't ALTER most things, batch mode rebuilds the table instead
+    context.configure(connection=connection, target_metadata=target_metadata,
+                      render_as_batch=connection.dialect.name == "sqlite")
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
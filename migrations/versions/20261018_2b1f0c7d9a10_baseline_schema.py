@@ -0,0 +1,160 @@
+"""Baseline schema
+
+Schema as created by dev/reset_database.py before the migrations existed. Databases created that way are brought
+under the migrations with "alembic stamp 2b1f0c7d9a10".
+
+Revision ID: 2b1f0c7d9a10
+Revises: 
+Create Date: 2026-10-18 13:39:18.569794
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2b1f0c7d9a10'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('categories',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('genere', sa.Enum('male', 'female', 'mixt', name='tournamentgenereenum'), nullable=False),
+    sa.Column('age', sa.Enum('juniors', 'seniors', name='agecategoriestypeenum'), nullable=False),
+    sa.Column('level', sa.Integer(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('facilities',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.Unicode(length=255), nullable=False),
+    sa.Column('latitude', sa.Float(), nullable=True),
+    sa.Column('longitude', sa.Float(), nullable=True),
+    sa.Column('address', sa.Unicode(length=255), nullable=True),
+    sa.Column('postal_code', sa.Unicode(length=12), nullable=True),
+    sa.Column('town', sa.Unicode(length=12), nullable=True),
+    sa.Column('provincia', sa.Unicode(length=12), nullable=True),
+    sa.Column('phone', sa.Unicode(length=50), nullable=True),
+    sa.Column('email', sa.Unicode(length=255), nullable=True),
+    sa.Column('web', sa.Unicode(length=255), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('users',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('username', sa.Unicode(length=50), nullable=False),
+    sa.Column('password', sa.UnicodeText(), nullable=False),
+    sa.Column('email', sa.Unicode(length=255), nullable=False),
+    sa.Column('name', sa.Unicode(length=50), nullable=True),
+    sa.Column('surname', sa.Unicode(length=50), nullable=True),
+    sa.Column('birthdate', sa.Date(), nullable=True),
+    sa.Column('genere', sa.Enum('male', 'female', name='genereenum'), nullable=False),
+    sa.Column('rol', sa.Enum('owner', 'player', name='rolenum'), nullable=False),
+    sa.Column('position', sa.Enum('left', 'rigth', name='positionenum'), nullable=True),
+    sa.Column('phone', sa.Unicode(length=50), nullable=True),
+    sa.Column('photo', sa.Unicode(length=255), nullable=True),
+    sa.Column('license', sa.Enum('have', 'dont', name='licenseenum'), nullable=True),
+    sa.Column('matchname', sa.Unicode(length=50), nullable=True),
+    sa.Column('prefsmash', sa.Enum('saque', 'derecha', 'reves', 'globo', 'cortada', 'mate', 'volea', name='smashenum'), nullable=True),
+    sa.Column('club', sa.Unicode(length=50), nullable=True),
+    sa.Column('timeplay', sa.Unicode(length=50), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('username')
+    )
+    op.create_table('couples',
+    sa.Column('player1_id', sa.Integer(), nullable=False),
+    sa.Column('player2_id', sa.Integer(), nullable=False),
+    sa.Column('wins', sa.Integer(), nullable=True),
+    sa.Column('losses', sa.Integer(), nullable=True),
+    sa.ForeignKeyConstraint(['player1_id'], ['users.id'], ),
+    sa.ForeignKeyConstraint(['player2_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('player1_id', 'player2_id')
+    )
+    op.create_table('matches',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('couple1_player1_id', sa.Integer(), nullable=True),
+    sa.Column('couple1_player2_id', sa.Integer(), nullable=True),
+    sa.Column('couple2_player1_id', sa.Integer(), nullable=True),
+    sa.Column('couple2_player2_id', sa.Integer(), nullable=True),
+    sa.Column('set1', sa.Unicode(length=12), nullable=True),
+    sa.Column('set2', sa.Unicode(length=12), nullable=True),
+    sa.Column('set3', sa.Unicode(length=12), nullable=True),
+    sa.ForeignKeyConstraint(['couple1_player1_id'], ['users.id'], ),
+    sa.ForeignKeyConstraint(['couple1_player2_id'], ['users.id'], ),
+    sa.ForeignKeyConstraint(['couple2_player1_id'], ['users.id'], ),
+    sa.ForeignKeyConstraint(['couple2_player2_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('tournaments',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('edited_at', sa.DateTime(), nullable=True),
+    sa.Column('name', sa.Unicode(length=255), nullable=False),
+    sa.Column('start_date', sa.DateTime(), nullable=False),
+    sa.Column('finish_date', sa.DateTime(), nullable=False),
+    sa.Column('start_register_date', sa.DateTime(), nullable=False),
+    sa.Column('finish_register_date', sa.DateTime(), nullable=False),
+    sa.Column('limit_couples', sa.Integer(), nullable=True),
+    sa.Column('inscription_type', sa.Enum('public', 'privat', name='tournamentprivacytypeenum'), nullable=True),
+    sa.Column('type', sa.Enum('americana', 'league', 'draft', name='tournamenttypeenum'), nullable=False),
+    sa.Column('price_1', sa.Float(), nullable=False),
+    sa.Column('price_2', sa.Float(), nullable=False),
+    sa.Column('description', sa.UnicodeText(), nullable=True),
+    sa.Column('poster', sa.Unicode(length=255), nullable=True),
+    sa.Column('owner_id', sa.Integer(), nullable=False),
+    sa.Column('facility_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['facility_id'], ['facilities.id'], ),
+    sa.ForeignKeyConstraint(['owner_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('users_tokens',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('token', sa.Unicode(length=50), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], onupdate='CASCADE', ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('token')
+    )
+    op.create_table('rounds',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.UnicodeText(), nullable=True),
+    sa.Column('category_id', sa.Integer(), nullable=False),
+    sa.Column('tournament_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['category_id'], ['categories.id'], ),
+    sa.ForeignKeyConstraint(['tournament_id'], ['tournaments.id'], ),
+    sa.PrimaryKeyConstraint('id', 'category_id')
+    )
+    op.create_table('tournament_categories_association',
+    sa.Column('tournament_id', sa.Integer(), nullable=False),
+    sa.Column('category_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['category_id'], ['categories.id'], onupdate='CASCADE', ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['tournament_id'], ['tournaments.id'], onupdate='CASCADE', ondelete='CASCADE')
+    )
+    op.create_table('tournament_inscriptions_association',
+    sa.Column('tournament_id', sa.Integer(), nullable=False),
+    sa.Column('users_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['tournament_id'], ['tournaments.id'], onupdate='CASCADE', ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['users_id'], ['users.id'], onupdate='CASCADE', ondelete='CASCADE')
+    )
+    op.create_table('round_matches_association',
+    sa.Column('round_id', sa.Integer(), nullable=False),
+    sa.Column('match_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['match_id'], ['matches.id'], onupdate='CASCADE', ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['round_id'], ['rounds.id'], onupdate='CASCADE', ondelete='CASCADE')
+    )
+
+
+def downgrade():
+    op.drop_table('round_matches_association')
+    op.drop_table('tournament_inscriptions_association')
+    op.drop_table('tournament_categories_association')
+    op.drop_table('rounds')
+    op.drop_table('users_tokens')
+    op.drop_table('tournaments')
+    op.drop_table('matches')
+    op.drop_table('couples')
+    op.drop_table('users')
+    op.drop_table('facilities')
+    op.drop_table('categories')
@@ -0,0 +1,50 @@
+"""Row versions, facility geohash and status indexes
+
+Changes made to the models before the migrations existed: users.version and tournaments.version (ETags), starting at
+1 for the rows already there, facilities.geohash (proximity search), computed for the facilities already there, and
+the indexes of the open / playing status filters of /tournamets/list.
+
+Revision ID: 3e6a9d2c7f15
+Revises: 2b1f0c7d9a10
+Create Date: 2026-10-18 13:39:30.412087
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from db import geo
+
+
+# revision identifiers, used by Alembic.
+revision = '3e6a9d2c7f15'
+down_revision = '2b1f0c7d9a10'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('users', sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+    op.add_column('tournaments', sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+
+    op.add_column('facilities', sa.Column('geohash', sa.Unicode(length=9), nullable=True))
+    op.create_index('ix_facilities_geohash', 'facilities', ['geohash'], unique=False)
+    geo.backfill_geohashes(op.get_bind())
+
+    op.create_index('ix_tournaments_status_register', 'tournaments', ['finish_register_date', 'finish_date'],
+                    unique=False)
+    op.create_index('ix_tournaments_status_finish', 'tournaments', ['finish_date', 'finish_register_date'],
+                    unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_tournaments_status_finish', table_name='tournaments')
+    op.drop_index('ix_tournaments_status_register', table_name='tournaments')
+
+    op.drop_index('ix_facilities_geohash', table_name='facilities')
+    with op.batch_alter_table('facilities') as batch_op:
+        batch_op.drop_column('geohash')
+
+    with op.batch_alter_table('tournaments') as batch_op:
+        batch_op.drop_column('version')
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.drop_column('version')
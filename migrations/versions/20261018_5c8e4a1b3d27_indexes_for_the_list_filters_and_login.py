@@ -0,0 +1,64 @@
+"""Indexes for the list filters and login
+
+Filters of /users (rol, club), of /tournamets/list (inscription_type and the category genere and age), the login
+lookup by email and both directions of the association tables. users.position, users.prefsmash and tournaments.type
+are left without index: they have 2, 7 and 3 evenly used values, so a scan is as fast or faster than the index
+(see dev/benchmarks/filter_indexes.py).
+
+Revision ID: 5c8e4a1b3d27
+Revises: 3e6a9d2c7f15
+Create Date: 2026-10-18 13:39:39.967365
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '5c8e4a1b3d27'
+down_revision = '3e6a9d2c7f15'
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ('users', 'ix_users_email', ['email']),
+    ('users', 'ix_users_rol', ['rol']),
+    ('users', 'ix_users_club', ['club']),
+    ('categories', 'ix_categories_genere', ['genere']),
+    ('categories', 'ix_categories_age', ['age']),
+    ('tournaments', 'ix_tournaments_inscription_type', ['inscription_type']),
+    ('tournament_categories_association', 'ix_tournament_categories_tournament_category',
+     ['tournament_id', 'category_id']),
+    ('tournament_categories_association', 'ix_tournament_categories_category_tournament',
+     ['category_id', 'tournament_id']),
+    ('tournament_inscriptions_association', 'ix_tournament_inscriptions_tournament_user',
+     ['tournament_id', 'users_id']),
+    ('tournament_inscriptions_association', 'ix_tournament_inscriptions_user_tournament',
+     ['users_id', 'tournament_id']),
+    ('round_matches_association', 'ix_round_matches_round_match', ['round_id', 'match_id']),
+    ('round_matches_association', 'ix_round_matches_match_round', ['match_id', 'round_id']),
+]
+
+# MySQL drops the index it created implicitly for a foreign key once another index can serve it, and then refuses to
+# drop that other index. The downgrade gives these columns a plain index back before removing the composite ones.
+FOREIGN_KEY_COLUMNS = [
+    ('tournament_categories_association', 'tournament_id'),
+    ('tournament_categories_association', 'category_id'),
+    ('tournament_inscriptions_association', 'tournament_id'),
+    ('tournament_inscriptions_association', 'users_id'),
+    ('round_matches_association', 'round_id'),
+    ('round_matches_association', 'match_id'),
+]
+
+
+def upgrade():
+    for table_name, index_name, columns in INDEXES:
+        op.create_index(index_name, table_name, columns, unique=False)
+
+
+def downgrade():
+    if op.get_bind().dialect.name == 'mysql':
+        for table_name, column in FOREIGN_KEY_COLUMNS:
+            op.create_index('fk_{}_{}'.format(table_name, column), table_name, [column], unique=False)
+
+    for table_name, index_name, columns in reversed(INDEXES):
+        op.drop_index(index_name, table_name=table_name)
@@ -0,0 +1,31 @@
+"""Thumbnail columns
+
+Sizes of the thumbnails already generated for users.photo and tournaments.poster (see thumbnails.py), NULL until
+they are on disk.
+
+Revision ID: 8d3f6b2e4c91
+Revises: 5c8e4a1b3d27
+Create Date: 2026-10-18 16:02:11.204518
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8d3f6b2e4c91'
+down_revision = '5c8e4a1b3d27'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('users', sa.Column('photo_thumbnails', sa.Unicode(length=64), nullable=True))
+    op.add_column('tournaments', sa.Column('poster_thumbnails', sa.Unicode(length=64), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('tournaments') as batch_op:
+        batch_op.drop_column('poster_thumbnails')
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.drop_column('photo_thumbnails')
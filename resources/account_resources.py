@@ -13,7 +13,7 @@ from resources import utils
 import settings
 import messages
 from db.models import User, UserToken, GenereEnum, RolEnum, PositionEnum, SmashEnum
-from hooks import requires_auth
+from hooks import requires_auth, invalidate_auth_token, invalidate_auth_user
 from resources.base_resources import DAMCoreResource
 from resources.schemas import SchemaUserToken, SchemaUpdateUser
 from settings import STATIC_DIRECTORY
@@ -25,29 +25,36 @@ mylogger = logging.getLogger(__name__)
 class ResourceAccountUpdateProfileImage(DAMCoreResource):
     def on_post(self, req, resp, *args, **kwargs):
         super(ResourceAccountUpdateProfileImage, self).on_post(req, resp, *args, **kwargs)
+        db_session = req.context["db_session"]
 
 
         # Get the user from the token
         current_user = req.context["auth_user"]
         resource_path = current_user.photo_path
-        print("TAG"+current_user.photo_path)
-        print(resource_path)
         # Get the file from form
         incoming_file = req.get_param("image_file")
 
         # Run the common part for storing
         filename = utils.save_static_media_file(incoming_file, resource_path)
 
-        # Update db model
-        current_user.photo = filename
-        self.db_session.add(current_user)
-        self.db_session.commit()
+        # Update db model, the thumbnails of the previous photo don't apply to the new one
+        if current_user.photo != filename:
+            current_user.photo = filename
+            current_user.photo_thumbnails = None
+        db_session.add(current_user)
+        db_session.commit()
+        user_id = current_user.id
+        invalidate_auth_user(user_id)
+
+        utils.schedule_media_thumbnails(current_user, "photo", resource_path, filename,
+                                        on_ready=lambda: invalidate_auth_user(user_id))
 
         resp.status = falcon.HTTP_200
 
 class ResourceCreateUserToken(DAMCoreResource):
     def on_post(self, req, resp, *args, **kwargs):
         super(ResourceCreateUserToken, self).on_post(req, resp, *args, **kwargs)
+        db_session = req.context["db_session"]
 
         basic_auth_raw = req.get_header("Authorization")
         if basic_auth_raw is not None:
@@ -58,19 +65,19 @@ class ResourceCreateUserToken(DAMCoreResource):
         else:
             raise falcon.HTTPUnauthorized(description=messages.authorization_header_required)
 
-        current_user = self.db_session.query(User).filter(User.email == auth_username).one_or_none()
+        current_user = db_session.query(User).filter(User.email == auth_username).one_or_none()
         if current_user is None:
-            current_user = self.db_session.query(User).filter(User.username == auth_username).one_or_none()
+            current_user = db_session.query(User).filter(User.username == auth_username).one_or_none()
 
         if (current_user is not None) and (current_user.check_password(auth_password)):
             current_token = current_user.create_token()
             try:
-                self.db_session.commit()
+                db_session.commit()
                 resp.media = {"token": current_token.token}
                 resp.status = falcon.HTTP_200
             except Exception as e:
                 mylogger.critical("{}:{}".format(messages.error_saving_user_token, e))
-                self.db_session.rollback()
+                db_session.rollback()
                 raise falcon.HTTPInternalServerError()
         else:
             raise falcon.HTTPUnauthorized(description=messages.user_not_found)
@@ -81,16 +88,18 @@ class ResourceDeleteUserToken(DAMCoreResource):
     @jsonschema.validate(SchemaUserToken)
     def on_post(self, req, resp, *args, **kwargs):
         super(ResourceDeleteUserToken, self).on_post(req, resp, *args, **kwargs)
+        db_session = req.context["db_session"]
 
         current_user = req.context["auth_user"]
-        selected_token_string = self.json_request["token"]
-        selected_token = self.db_session.query(UserToken).filter(UserToken.token == selected_token_string).one_or_none()
+        selected_token_string = req.media["token"]
+        selected_token = db_session.query(UserToken).filter(UserToken.token == selected_token_string).one_or_none()
 
         if selected_token is not None:
             if selected_token.user.id == current_user.id:
                 try:
-                    self.db_session.delete(selected_token)
-                    self.db_session.commit()
+                    db_session.delete(selected_token)
+                    db_session.commit()
+                    invalidate_auth_token(selected_token_string)
 
                     resp.status = falcon.HTTP_200
                 except Exception as e:
@@ -109,6 +118,12 @@ class ResourceAccountUserProfile(DAMCoreResource):
 
         current_user = req.context["auth_user"]
 
+        aux_etag = utils.make_etag("account", current_user.id, current_user.version)
+        resp.set_header("ETag", aux_etag)
+        if utils.etag_matches(req, aux_etag):
+            resp.status = falcon.HTTP_304
+            return
+
         resp.media = current_user.json_model
         resp.status = falcon.HTTP_200
 
@@ -117,6 +132,7 @@ class ResourceAccountUpdateUserProfile(DAMCoreResource):
     @jsonschema.validate(SchemaUpdateUser)
     def on_put(self, req, resp, *args, **kwargs):
         super(ResourceAccountUpdateUserProfile, self).on_put(req, resp, *args, **kwargs)
+        db_session = req.context["db_session"]
 
         current_user = req.context["auth_user"]
 
@@ -152,6 +168,7 @@ class ResourceAccountUpdateUserProfile(DAMCoreResource):
             except AttributeError:
                 raise falcon.HTTPBadRequest(description=messages.parameters_invalid)
 
-        self.db_session.add(current_user)
-        self.db_session.commit()
+        db_session.add(current_user)
+        db_session.commit()
+        invalidate_auth_user(current_user.id)
         resp.status = falcon.HTTP_200
@@ -12,9 +12,6 @@ class DAMCoreResource(object):
         mylogger.debug("New request {} {}?{} from host: {}".format(request.method, request.path, request.query_string,
                                                                    request.access_route))
 
-    def __init__(self):
-        self.db_session = None
-
     def on_get(self, req, resp, *args, **kwargs):
         self.__print_request(req)
 
@@ -7,7 +7,10 @@ import falcon
 from sqlalchemy.orm import joinedload
 from sqlalchemy.orm.exc import NoResultFound
 
+import db
 import messages
+import metrics
+from cache import RESULT_CACHES
 from resources.base_resources import DAMCoreResource
 
 mylogger = logging.getLogger(__name__)
@@ -20,3 +23,26 @@ class ResourceHome(DAMCoreResource):
         resp.media = messages.welcome_message
         resp.status = falcon.HTTP_200
 
+
+class ResourceCacheStats(DAMCoreResource):
+    def on_get(self, req, resp, *args, **kwargs):
+        super(ResourceCacheStats, self).on_get(req, resp, *args, **kwargs)
+
+        resp.media = {name: result_cache.stats for name, result_cache in RESULT_CACHES.items()}
+        resp.status = falcon.HTTP_200
+
+
+class ResourcePoolStats(DAMCoreResource):
+    def on_get(self, req, resp, *args, **kwargs):
+        super(ResourcePoolStats, self).on_get(req, resp, *args, **kwargs)
+
+        resp.media = db.pool_stats()
+        resp.status = falcon.HTTP_200
+
+
+class ResourceMetrics(DAMCoreResource):
+    def on_get(self, req, resp, *args, **kwargs):
+        super(ResourceMetrics, self).on_get(req, resp, *args, **kwargs)
+
+        resp.data, resp.content_type = metrics.render()
+        resp.status = falcon.HTTP_200
@@ -1,31 +1,101 @@
 #!/usr/bin/python
 # -*- coding: utf-8 -*-
 
+import datetime
 import logging
 
 import falcon
 from falcon.media.validators import jsonschema
+from sqlalchemy import and_, event, inspect, or_
 from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, joinedload, selectinload
 from sqlalchemy.orm.exc import NoResultFound
 
+import db
 import messages
-from db.models import Tournament, TournamentTypeEnum, TournamentPrivacyTypeEnum, TournamentGenereEnum, Category, \
-    TournamentCategoriesAssociation, AgeCategoriesTypeEnum
+import settings
+from cache import ResultCache, create_cache_backend
+from media_handlers import JSON_HANDLER
+from db import geo
+from db.models import User, Tournament, TournamentTypeEnum, TournamentPrivacyTypeEnum, TournamentGenereEnum, Category, \
+    AgeCategoriesTypeEnum, Round, Match, Facility, TournamentStatusEnum
 from hooks import requires_auth
+from resources import utils
 from resources.base_resources import DAMCoreResource
 
 from resources.schemas import SchemaRegisterUser
 
 mylogger = logging.getLogger(__name__)
 
+# Loader strategies for everything Tournament.json_model touches, so a tournament (or a whole list of them) is
+# serialized with a fixed number of queries: tournaments + facility (joined), categories, rounds and matches with
+# their four players (joined).
+_tournament_matches_load = selectinload(Tournament.rounds).selectinload(Round.matches)
+TOURNAMENT_LOADER_OPTIONS = (
+    joinedload(Tournament.facility),
+    selectinload(Tournament.categories),
+    _tournament_matches_load.joinedload(Match.couple1_p1),
+    _tournament_matches_load.joinedload(Match.couple1_p2),
+    _tournament_matches_load.joinedload(Match.couple2_p1),
+    _tournament_matches_load.joinedload(Match.couple2_p2),
+)
+
+# Serialized /tournamets/list pages, emptied whenever a commit touches something they include. With the memory backend
+# only the cache of the worker that commits is emptied: in the other workers RESULT_CACHE_TTL bounds the staleness
+TOURNAMENTS_LIST_CACHE = ResultCache("tournaments_list", create_cache_backend(
+    settings.RESULT_CACHE_BACKEND, settings.RESULT_CACHE_SIZE, settings.RESULT_CACHE_TTL,
+    settings.RESULT_CACHE_SQLITE_PATH), replica_grace=settings.RESULT_CACHE_REPLICA_GRACE)
+
+
+def _changes_tournaments_list(instance):
+    if isinstance(instance, (Tournament, Category, Round, Match, Facility)):
+        return True
+    # The matches of the pages include the name and surname of their players
+    return isinstance(instance, User) and any(inspect(instance).attrs[attribute].history.has_changes()
+                                              for attribute in ("name", "surname"))
+
+
+# noinspection PyUnusedLocal
+@event.listens_for(Session, "after_flush")
+def _track_tournaments_changes(session, flush_context):
+    for instance in list(session.new) + list(session.dirty) + list(session.deleted):
+        if _changes_tournaments_list(instance):
+            session.info["tournaments_changed"] = True
+            break
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_tournaments_list_cache(session):
+    if session.info.pop("tournaments_changed", False):
+        TOURNAMENTS_LIST_CACHE.invalidate()
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_tournaments_changes(session, previous_transaction):
+    session.info.pop("tournaments_changed", None)
+
 
 class ResourceGetTournament(DAMCoreResource):
     def on_get(self, req, resp, *args, **kwargs):
         super(ResourceGetTournament, self).on_get(req, resp, *args, **kwargs)
+        db_session = req.context["db_session"]
 
         if "id" in kwargs:
             try:
-                aux_tourn = self.db_session.query(Tournament).filter(Tournament.id == kwargs["id"]).one()
+                # The status is part of the ETag because it changes over time without the row changing
+                aux_version = db_session.query(Tournament.version, Tournament.finish_register_date,
+                                               Tournament.finish_date) \
+                    .filter(Tournament.id == kwargs["id"]).one()
+                aux_etag = utils.make_etag("tournament", kwargs["id"], aux_version.version,
+                                           Tournament.status_at(aux_version.finish_register_date,
+                                                                aux_version.finish_date).value)
+                resp.set_header("ETag", aux_etag)
+                if utils.etag_matches(req, aux_etag):
+                    resp.status = falcon.HTTP_304
+                    return
+
+                aux_tourn = db_session.query(Tournament).options(*TOURNAMENT_LOADER_OPTIONS) \
+                    .filter(Tournament.id == kwargs["id"]).one()
 
                 resp.media = aux_tourn.json_model
                 resp.status = falcon.HTTP_200
@@ -37,6 +107,7 @@ class ResourceGetTournament(DAMCoreResource):
 class ResourceGetTournaments(DAMCoreResource):
     def on_get(self, req, resp, *args, **kwargs):
         super(ResourceGetTournaments, self).on_get(req, resp, *args, **kwargs)
+        db_session = req.context["db_session"]
 
         # Mirem si ens passen un argument opcional que sigui el Type
         request_tournament_type = req.get_param("type", False)
@@ -70,8 +141,61 @@ class ResourceGetTournaments(DAMCoreResource):
                     request_tournament_age not in [i.value for i in AgeCategoriesTypeEnum.__members__.values()]):
                 raise falcon.HTTPInvalidParam(messages.age_invalid, "age")
 
-        response_tournaments = list()
-        aux_tournaments = self.db_session.query(Tournament)
+        # Mirem si ens passen un status (es filtra a la base de dades)
+        request_tournament_status = req.get_param("status", False)
+        if request_tournament_status is not None:
+            request_tournament_status = request_tournament_status.upper()
+            if (len(request_tournament_status) != 1) or (
+                    request_tournament_status not in [i.value for i in TournamentStatusEnum.__members__.values()]):
+                raise falcon.HTTPInvalidParam(messages.status_invalid, "status")
+
+        # Cerca per proximitat: lat i lon en graus i radius_km en quilometres, ordenat per distancia
+        request_latitude = req.get_param_as_float("lat", min_value=-90, max_value=90)
+        request_longitude = req.get_param_as_float("lon", min_value=-180, max_value=180)
+        if (request_latitude is None) != (request_longitude is None):
+            raise falcon.HTTPInvalidParam(messages.proximity_coordinates_required,
+                                          "lat" if request_latitude is None else "lon")
+        request_radius = None
+        if request_latitude is not None:
+            request_radius = req.get_param_as_float("radius_km", min_value=0, max_value=settings.MAX_SEARCH_RADIUS_KM,
+                                                    default=settings.DEFAULT_SEARCH_RADIUS_KM)
+
+        # Paginacio per keyset sobre (start_date, id)
+        request_limit = req.get_param_as_int("limit", min_value=1, max_value=settings.MAX_PAGE_SIZE)
+
+        request_cursor = req.get_param("cursor", False)
+        if request_cursor is not None:
+            request_cursor = utils.decode_cursor(request_cursor, (datetime.datetime.fromisoformat, int))
+            if request_cursor is None:
+                raise falcon.HTTPInvalidParam(messages.cursor_invalid, "cursor")
+
+        request_stream = req.get_param_as_bool("stream", blank_as_true=True)
+
+        # Els resultats per proximitat no estan ordenats per (start_date, id)
+        if request_latitude is not None:
+            if request_cursor is not None:
+                raise falcon.HTTPInvalidParam(messages.proximity_pagination_invalid, "cursor")
+            if request_stream:
+                raise falcon.HTTPInvalidParam(messages.proximity_pagination_invalid, "stream")
+
+        aux_cache_key = None
+        if not request_stream:
+            aux_cache_key = ResultCache.make_key(request_tournament_type, request_inscription_type,
+                                                 request_tournament_genere, request_tournament_age,
+                                                 request_tournament_status, request_latitude, request_longitude,
+                                                 request_radius, request_limit, request_cursor)
+            aux_cached_page = TOURNAMENTS_LIST_CACHE.get(aux_cache_key)
+            if aux_cached_page is not None:
+                aux_body, aux_next_cursor = aux_cached_page
+                if aux_next_cursor is not None:
+                    resp.set_header("X-Next-Cursor", aux_next_cursor)
+                resp.set_header("X-Cache", "HIT")
+                resp.content_type = falcon.MEDIA_JSON
+                resp.data = aux_body
+                resp.status = falcon.HTTP_200
+                return
+
+        aux_tournaments = db_session.query(Tournament)
 
         if request_tournament_type is not None:
             aux_tournaments = aux_tournaments.filter(
@@ -81,19 +205,119 @@ class ResourceGetTournaments(DAMCoreResource):
             aux_tournaments = aux_tournaments.filter(
                 Tournament.inscription_type == TournamentPrivacyTypeEnum(request_inscription_type))
 
+        # Category filters use EXISTS so a tournament is never returned twice and both filters can be combined
         if request_tournament_genere is not None:
-            aux_tournaments = aux_tournaments.join(TournamentCategoriesAssociation,Category).filter(
-                Category.genere == TournamentGenereEnum(request_tournament_genere))
+            aux_tournaments = aux_tournaments.filter(
+                Tournament.categories.any(Category.genere == TournamentGenereEnum(request_tournament_genere)))
 
         if request_tournament_age is not None:
-            aux_tournaments = aux_tournaments.join(TournamentCategoriesAssociation,Category).filter(
-                Category.age == AgeCategoriesTypeEnum(request_tournament_age))
+            aux_tournaments = aux_tournaments.filter(
+                Tournament.categories.any(Category.age == AgeCategoriesTypeEnum(request_tournament_age)))
+
+        if request_tournament_status is not None:
+            aux_tournaments = aux_tournaments.filter(
+                Tournament.status_filter(TournamentStatusEnum(request_tournament_status)))
 
-        if aux_tournaments is not None:
-            for current_torunament in aux_tournaments.all():
-                response_tournaments.append(current_torunament.json_model)
+        if request_cursor is not None:
+            aux_tournaments = aux_tournaments.filter(_tournaments_after(*request_cursor))
+
+        if request_stream:
+            resp.content_type = falcon.MEDIA_JSON
+            resp.stream = _stream_tournaments(aux_tournaments.options(*TOURNAMENT_LOADER_OPTIONS)
+                                              .order_by(Tournament.start_date, Tournament.id), request_limit)
+        else:
+            aux_next_cursor = None
+            if request_latitude is not None:
+                response_tournaments = list()
+                for current_torunament, current_distance in _nearby_tournaments(
+                        aux_tournaments, request_latitude, request_longitude, request_radius, request_limit):
+                    aux_model = current_torunament.json_model
+                    aux_model["distance_km"] = round(current_distance, 3)
+                    response_tournaments.append(aux_model)
+            else:
+                aux_tournaments = aux_tournaments.options(*TOURNAMENT_LOADER_OPTIONS) \
+                    .order_by(Tournament.start_date, Tournament.id)
+                if request_limit is not None:
+                    aux_tournaments = aux_tournaments.limit(request_limit + 1)
+
+                response_tournaments = list()
+                aux_last_tournament = None
+                for current_torunament in aux_tournaments.all():
+                    if (request_limit is not None) and (len(response_tournaments) == request_limit):
+                        aux_next_cursor = _tournament_cursor(aux_last_tournament)
+                        resp.set_header("X-Next-Cursor", aux_next_cursor)
+                        break
+                    response_tournaments.append(current_torunament.json_model)
+                    aux_last_tournament = current_torunament
+
+            aux_body = JSON_HANDLER.serialize(response_tournaments, falcon.MEDIA_JSON)
+            TOURNAMENTS_LIST_CACHE.set(aux_cache_key, (aux_body, aux_next_cursor),
+                                       from_replica=db.read_from_replica(db_session))
+            resp.set_header("X-Cache", "MISS")
+            resp.content_type = falcon.MEDIA_JSON
+            resp.data = aux_body
 
-        resp.media = response_tournaments
         resp.status = falcon.HTTP_200
 
 
+def _tournaments_after(start_date, tournament_id):
+    return or_(Tournament.start_date > start_date,
+               and_(Tournament.start_date == start_date, Tournament.id > tournament_id))
+
+
+def _nearby_tournaments(tournaments_query, latitude, longitude, radius_km, limit):
+    # Primer nomes les claus dels tornejos del voltant (prefiltre per geohash + distancia exacta), i despres es
+    # carreguen sencers nomes els de la pagina
+    aux_keys = list()
+    for current_key in tournaments_query.join(Tournament.facility) \
+            .filter(Facility.nearby_filter(latitude, longitude, radius_km)) \
+            .with_entities(Tournament.id, Tournament.start_date, Facility.latitude, Facility.longitude):
+        aux_distance = geo.haversine_km(latitude, longitude, current_key.latitude, current_key.longitude)
+        if aux_distance <= radius_km:
+            aux_keys.append((aux_distance, current_key.start_date, current_key.id))
+    aux_keys.sort()
+    if limit is not None:
+        aux_keys = aux_keys[:limit]
+    if len(aux_keys) == 0:
+        return list()
+
+    aux_tournaments = {current_tournament.id: current_tournament for current_tournament in tournaments_query
+                       .options(*TOURNAMENT_LOADER_OPTIONS).filter(Tournament.id.in_([key[2] for key in aux_keys]))}
+    return [(aux_tournaments[tournament_id], distance) for distance, start_date, tournament_id in aux_keys]
+
+
+def _tournament_cursor(tournament):
+    return utils.encode_cursor(tournament.start_date, tournament.id)
+
+
+def _stream_tournaments(tournaments_query, limit):
+    # Runs once the responder has returned and the request session is closed, so it uses its own session (on the same
+    # engine as the request, which is the async one under asgi.py) and walks the result in keyset chunks: only
+    # STREAM_CHUNK_SIZE tournaments are kept in memory at any time.
+    db_session = db.create_db_session(bind=tournaments_query.session.get_bind())
+    try:
+        yield b"["
+        pending = limit
+        last_tournament = None
+        while (pending is None) or (pending > 0):
+            chunk_size = settings.STREAM_CHUNK_SIZE if pending is None else min(pending, settings.STREAM_CHUNK_SIZE)
+            chunk_query = tournaments_query.with_session(db_session)
+            if last_tournament is not None:
+                chunk_query = chunk_query.filter(_tournaments_after(*last_tournament))
+            chunk = chunk_query.limit(chunk_size).all()
+            if len(chunk) == 0:
+                break
+
+            aux_chunk = b",".join(JSON_HANDLER.serialize(current_tournament.json_model, falcon.MEDIA_JSON)
+                                  for current_tournament in chunk)
+            yield aux_chunk if last_tournament is None else b"," + aux_chunk
+
+            last_tournament = (chunk[-1].start_date, chunk[-1].id)
+            if pending is not None:
+                pending -= len(chunk)
+            db_session.expunge_all()
+            if len(chunk) < chunk_size:
+                break
+        yield b"]"
+    finally:
+        db_session.close()
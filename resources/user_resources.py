@@ -6,11 +6,13 @@ import logging
 import falcon
 from falcon.media.validators import jsonschema
 from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import load_only
 from sqlalchemy.orm.exc import NoResultFound
 
 import messages
 from db.models import User, GenereEnum, RolEnum, PositionEnum,SmashEnum
 from hooks import requires_auth
+from resources import utils
 from resources.base_resources import DAMCoreResource
 from resources.schemas import SchemaRegisterUser
 
@@ -20,10 +22,19 @@ mylogger = logging.getLogger(__name__)
 class ResourceGetUserProfile(DAMCoreResource):
     def on_get(self, req, resp, *args, **kwargs):
         super(ResourceGetUserProfile, self).on_get(req, resp, *args, **kwargs)
+        db_session = req.context["db_session"]
 
         if "username" in kwargs:
             try:
-                aux_user = self.db_session.query(User).filter(User.username == kwargs["username"]).one()
+                aux_version = db_session.query(User.id, User.version) \
+                    .filter(User.username == kwargs["username"]).one()
+                aux_etag = utils.make_etag("user", aux_version.id, aux_version.version)
+                resp.set_header("ETag", aux_etag)
+                if utils.etag_matches(req, aux_etag):
+                    resp.status = falcon.HTTP_304
+                    return
+
+                aux_user = db_session.query(User).filter(User.id == aux_version.id).one()
 
                 resp.media = aux_user.public_profile
                 resp.status = falcon.HTTP_200
@@ -36,6 +47,7 @@ class ResourceGetUserProfile(DAMCoreResource):
 class ResourceGetUsers(DAMCoreResource):
     def on_get(self, req, resp, *args, **kwargs):
         super(ResourceGetUsers, self).on_get(req, resp, *args, **kwargs)
+        db_session = req.context["db_session"]
 
         # Mirem si ens passen un argument opcional que sigui el rol
         request_users_rol = req.get_param("rol", False)
@@ -65,8 +77,20 @@ class ResourceGetUsers(DAMCoreResource):
         # Mirem si ens passen un argument opcional que sigui el club
         request_users_club = req.get_param("club", False)
 
+        # Mirem si ens demanen nomes alguns camps del usuari
+        request_users_fields = req.get_param("fields", False)
+        if request_users_fields is not None:
+            request_users_fields = list(dict.fromkeys(field.strip() for field in request_users_fields.split(",")
+                                                      if field.strip() != ""))
+            if (len(request_users_fields) == 0) or any(
+                    field not in User.JSON_MODEL_ATTRIBUTES for field in request_users_fields):
+                raise falcon.HTTPInvalidParam(messages.fields_invalid, "fields")
+
         response_users = list()
-        aux_users = self.db_session.query(User)
+        aux_users = db_session.query(User)
+
+        if request_users_fields is not None:
+            aux_users = aux_users.options(load_only(*User.json_model_columns(request_users_fields)))
 
         if request_users_rol is not None:
             aux_users = aux_users.filter(
@@ -86,7 +110,10 @@ class ResourceGetUsers(DAMCoreResource):
 
         if aux_users is not None:
             for current_user in aux_users.all():
-                response_users.append(current_user.json_model)
+                if request_users_fields is not None:
+                    response_users.append(current_user.sparse_json_model(request_users_fields))
+                else:
+                    response_users.append(current_user.json_model)
         resp.media = response_users
         resp.status = falcon.HTTP_200
 
@@ -95,6 +122,7 @@ class ResourceRegisterUser(DAMCoreResource):
     @jsonschema.validate(SchemaRegisterUser)
     def on_post(self, req, resp, *args, **kwargs):
         super(ResourceRegisterUser, self).on_post(req, resp, *args, **kwargs)
+        db_session = req.context["db_session"]
 
         aux_user = User()
 
@@ -115,10 +143,10 @@ class ResourceRegisterUser(DAMCoreResource):
             aux_user.genere = aux_genere
             aux_user.rol = aux_rol
 
-            self.db_session.add(aux_user)
+            db_session.add(aux_user)
 
             try:
-                self.db_session.commit()
+                db_session.commit()
             except IntegrityError:
                 raise falcon.HTTPBadRequest(description=messages.user_exists)
 
@@ -1,28 +1,142 @@
-import datetime
+import base64
+import binascii
+import hashlib
+import logging
 import os
+import uuid
 
+import falcon
 
-def save_static_media_file(incoming_file, resource_path):
+import db
+import messages
+import settings
+import thumbnails
 
-    # Generate and id with the currrent timestamp
-    imgId = str(int(datetime.datetime.now().timestamp() * 1000))
+mylogger = logging.getLogger(__name__)
 
-    # Build filename using the id generated
-    filename = imgId + "." + incoming_file.filename.split(".")[-1]
+
+def save_static_media_file(incoming_file, resource_path, max_size=None, chunk_size=None):
+    # Stores an uploaded file in resource_path named by the SHA-256 of its content and returns the filename. The
+    # upload is copied in chunks, so it is never held in memory, and an identical file already stored is reused
+    if max_size is None:
+        max_size = settings.UPLOAD_MAX_SIZE
+    if chunk_size is None:
+        chunk_size = settings.UPLOAD_CHUNK_SIZE
 
     # Check if folder exists or not in the server
-    if not os.path.exists(resource_path):
-        os.makedirs(resource_path)
+    os.makedirs(resource_path, exist_ok=True)
+
+    # Write to a temporary file to prevent incomplete files from being used, one per upload so concurrent uploads
+    # never share it
+    temp_file_path = os.path.join(resource_path, ".{}~".format(uuid.uuid4().hex))
+    content_hash = hashlib.sha256()
+    size = 0
+    # Opened before the try: if it can't be created there is nothing to remove, and its error is the one raised
+    temp_file = open(temp_file_path, "xb")
+    try:
+        with temp_file as f:
+            while True:
+                chunk = incoming_file.file.read(chunk_size)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_size:
+                    raise falcon.HTTPPayloadTooLarge(description=messages.upload_too_large)
+                content_hash.update(chunk)
+                f.write(chunk)
+            f.flush()
+            os.fsync(f.fileno())
+    except BaseException:
+        os.remove(temp_file_path)
+        raise
 
-    # Create a file path
-    file_path = resource_path + filename
+    # Build filename using the content hash: the same content always gets the same name
+    filename = content_hash.hexdigest() + _file_extension(incoming_file.filename)
+    file_path = os.path.join(resource_path, filename)
 
-    # Write to a temporary file to prevent incomplete files from being used
-    temp_file_path = file_path + "~"
-    with open(temp_file_path, "wb") as f:
-        f.write(incoming_file.file.read())
+    if os.path.exists(file_path):
+        mylogger.debug("Duplicated upload, reusing {}".format(file_path))
+        os.remove(temp_file_path)
+        return filename
 
     # File has been fully saved to disk move it into place
-    os.rename(temp_file_path, file_path)
+    os.replace(temp_file_path, file_path)
+    _fsync_directory(resource_path)
+
+    return filename
+
+
+def schedule_media_thumbnails(instance, attribute_name, resource_path, filename, on_ready=None):
+    # Generates the thumbnails of the image just stored in instance.<attribute_name> off the request. Once they are on
+    # disk <attribute_name>_thumbnails is set, unless the image has been replaced meanwhile
+    model_class = type(instance)
+    instance_id = instance.id
+
+    def _mark_ready(sizes):
+        db_session = db.create_db_session()
+        try:
+            db_session.query(model_class) \
+                .filter(model_class.id == instance_id, getattr(model_class, attribute_name) == filename) \
+                .update({getattr(model_class, attribute_name + "_thumbnails"): sizes,
+                         model_class.version: model_class.version + 1}, synchronize_session=False)
+            db_session.commit()
+        finally:
+            db_session.close()
+        if on_ready is not None:
+            on_ready()
+
+    return thumbnails.schedule_thumbnails(resource_path, filename, _mark_ready)
+
+
+def _file_extension(filename):
+    extension = os.path.splitext(filename or "")[1].lower()
+    if (len(extension) > 1) and extension[1:].isalnum():
+        return extension
+    return ""
+
+
+def _fsync_directory(path):
+    # The rename is only durable once the directory entry is on disk
+    try:
+        directory_fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(directory_fd)
+    except OSError:
+        pass
+    finally:
+        os.close(directory_fd)
+
+
+def encode_cursor(*values):
+    # Opaque cursor used by keyset pagination: the sort key values of the last row sent
+    raw_cursor = "|".join(str(value) for value in values)
+    return base64.urlsafe_b64encode(raw_cursor.encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor, parsers):
+    # Returns the values encoded by encode_cursor parsed with the given callables, or None if the cursor is invalid
+    try:
+        raw_values = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8").split("|")
+        if len(raw_values) != len(parsers):
+            return None
+        return [parser(raw_value) for parser, raw_value in zip(parsers, raw_values)]
+    except (binascii.Error, UnicodeError, ValueError):
+        return None
+
+
+def make_etag(*values):
+    return '"{}"'.format("-".join(str(value) for value in values))
+
 
-    return filename
\ No newline at end of file
+def etag_matches(req, etag):
+    # If-None-Match uses the weak comparison, so W/ prefixes are ignored
+    if_none_match = req.get_header("If-None-Match")
+    if if_none_match is None:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    request_etags = [request_etag.strip() for request_etag in if_none_match.split(",")]
+    return any((request_etag[2:] if request_etag.startswith("W/") else request_etag) == etag
+               for request_etag in request_etags)
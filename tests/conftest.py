@@ -0,0 +1,66 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# The tests run against a SQLite database filled by dev/generate_data.py, created in a temporary directory before
+# settings.py is imported. From the project directory:
+#
+#   python -m pytest -q tests
+
+import os
+import tempfile
+
+import pytest
+
+WORK_DIRECTORY = tempfile.mkdtemp(prefix="damcore_tests_")
+os.environ["DAMCore_DB_URL"] = "sqlite:///{}".format(os.path.join(WORK_DIRECTORY, "tests.sqlite"))
+os.environ["DAMCore_STATIC_DIRECTORY"] = os.path.join(WORK_DIRECTORY, "static")
+# A route that lazy loads a relationship in a loop (N+1 queries) answers 500 and its test fails
+os.environ.setdefault("DAMCore_LAZY_LOAD_CHECK", "raise")
+os.environ["DAMCore_AUTH_REVOCATIONS_SQLITE_PATH"] = os.path.join(WORK_DIRECTORY, "auth", "revocations.sqlite")
+
+USERS = 300
+TOURNAMENTS = 120
+
+
+@pytest.fixture(scope="session")
+def database():
+    import db
+    from dev import generate_data
+    generate_data.create_database(db.DB_ENGINE, generate_data.parse_args(
+        ["--users", str(USERS), "--tournaments", str(TOURNAMENTS), "--facilities", "20", "--tokens", "10"]))
+    return db.DB_ENGINE
+
+
+@pytest.fixture(scope="session")
+def client(database):
+    import app
+    from falcon import testing
+    return testing.TestClient(app.app)
+
+
+@pytest.fixture
+def auth_headers(database):
+    from dev.generate_data import generated_token
+    return {"Authorization": generated_token(1)}
+
+
+@pytest.fixture
+def count_statements(database):
+    """Returns a function that runs a callable and gives the SQL statements it executed."""
+    from sqlalchemy import event
+
+    statements = list()
+
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    def run(function):
+        del statements[:]
+        event.listen(database, "before_cursor_execute", _before_cursor_execute)
+        try:
+            function()
+        finally:
+            event.remove(database, "before_cursor_execute", _before_cursor_execute)
+        return list(statements)
+
+    return run
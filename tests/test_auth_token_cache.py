@@ -0,0 +1,58 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Every gunicorn worker caches the tokens it has authenticated. Two caches stand for two workers here: the requests
+# that delete a token or update a user run on the first one, and the second one must stop using its cached copy.
+
+import base64
+
+import pytest
+
+import hooks
+import settings
+from cache import LRUTTLCache
+
+
+@pytest.fixture
+def workers(client, monkeypatch):
+    first_cache = hooks.AUTH_TOKEN_CACHE
+    second_cache = LRUTTLCache(settings.AUTH_TOKEN_CACHE_SIZE, settings.AUTH_TOKEN_CACHE_TTL)
+
+    def on_worker(cache, request, *args, **kwargs):
+        monkeypatch.setattr(hooks, "AUTH_TOKEN_CACHE", cache)
+        return request(*args, **kwargs)
+
+    return lambda request, *args, **kwargs: on_worker(first_cache, request, *args, **kwargs), \
+        lambda request, *args, **kwargs: on_worker(second_cache, request, *args, **kwargs)
+
+
+def _login(client, username):
+    credentials = base64.b64encode("{}:000000".format(username).encode("utf-8")).decode("ascii")
+    result = client.simulate_post("/account/create_token", headers={"Authorization": "Basic " + credentials})
+    assert result.status_code == 200
+    return {"Authorization": result.json["token"]}
+
+
+def test_deleted_token(client, workers):
+    first_worker, second_worker = workers
+    headers = _login(client, "player5")
+    for worker in workers:
+        assert worker(client.simulate_get, "/account/profile", headers=headers).status_code == 200
+
+    result = first_worker(client.simulate_post, "/account/delete_token", headers=headers,
+                          json={"token": headers["Authorization"]})
+    assert result.status_code == 200
+    for worker in workers:
+        assert worker(client.simulate_get, "/account/profile", headers=headers).status_code == 401
+
+
+def test_updated_user(client, workers):
+    first_worker, second_worker = workers
+    headers = _login(client, "player6")
+    assert second_worker(client.simulate_get, "/account/profile", headers=headers).json["club"] != "Revoked club"
+
+    result = first_worker(client.simulate_put, "/account/update_profile", headers=headers,
+                          json={"club": "Revoked club"})
+    assert result.status_code == 200
+    for worker in workers:
+        assert worker(client.simulate_get, "/account/profile", headers=headers).json["club"] == "Revoked club"
@@ -0,0 +1,21 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Facilities written without the ORM have no geohash, so the proximity search can't find them until
+# geo.backfill_geohashes fills it.
+
+from db import geo
+from db.models import Facility
+
+
+def test_backfill_geohashes(database):
+    facilities = Facility.__table__
+    with database.begin() as connection:
+        row = connection.execute(facilities.select().where(facilities.c.latitude.isnot(None)).limit(1)).one()
+        connection.execute(facilities.update().where(facilities.c.id == row.id).values(geohash=None))
+        nearby = facilities.select().where(Facility.nearby_filter(row.latitude, row.longitude, 1))
+        assert row.id not in [aux_row.id for aux_row in connection.execute(nearby)]
+
+        assert geo.backfill_geohashes(connection, batch_size=7) == 1
+        assert row.id in [aux_row.id for aux_row in connection.execute(nearby)]
+        assert geo.backfill_geohashes(connection) == 0
@@ -0,0 +1,66 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# media_handlers.JSON_HANDLER encodes datetimes and enums itself. Its output has to be byte for byte what falcon's
+# default JSON handler wrote when the models converted those values in Python before building resp.media.
+
+import datetime
+
+import falcon
+import pytest
+from falcon import media
+
+from db.json_model import _convert_value
+from db.models import User, Tournament, GenereEnum, RolEnum, PositionEnum, USER_JSON_MODEL, \
+    USER_PUBLIC_PROFILE_JSON_MODEL, TOURNAMENT_JSON_MODEL
+from media_handlers import JSON_HANDLER
+from resources.tournament_resources import TOURNAMENT_LOADER_OPTIONS
+
+
+def _convert_in_python(media_object):
+    if isinstance(media_object, dict):
+        return {key: _convert_in_python(value) for key, value in media_object.items()}
+    elif isinstance(media_object, list):
+        return [_convert_in_python(value) for value in media_object]
+    return _convert_value(media_object)
+
+
+def _assert_same_bytes(payload):
+    expected = media.JSONHandler().serialize(_convert_in_python(payload), falcon.MEDIA_JSON)
+    assert JSON_HANDLER.serialize(payload, falcon.MEDIA_JSON) == expected
+
+
+@pytest.fixture
+def db_session(database):
+    import db
+    db_session = db.create_db_session()
+    yield db_session
+    db_session.close()
+
+
+def test_users(db_session):
+    users = db_session.query(User).order_by(User.id).limit(50).all()
+    # Nulls, non ASCII text, a date of birth and every enum
+    users.append(User(id=100000, username="ñandú", email="n@example.com",
+                      created_at=datetime.datetime(2020, 2, 29, 23, 59), name=None, surname="Güell",
+                      birthdate=datetime.date(1999, 12, 31), genere=GenereEnum.female, rol=RolEnum.owner,
+                      position=PositionEnum.left, prefsmash=None, club=None, photo=None))
+    _assert_same_bytes([USER_JSON_MODEL(user) for user in users])
+    _assert_same_bytes([USER_PUBLIC_PROFILE_JSON_MODEL(user) for user in users])
+
+
+def test_tournaments(db_session):
+    tournaments = db_session.query(Tournament).options(*TOURNAMENT_LOADER_OPTIONS).order_by(Tournament.id) \
+        .limit(30).all()
+    assert any(len(tournament.rounds) > 0 for tournament in tournaments)
+    _assert_same_bytes([TOURNAMENT_JSON_MODEL(tournament) for tournament in tournaments])
+
+
+def test_tournament_with_nulls():
+    tournament = Tournament(id=1, name="Torneig", created_at=datetime.datetime(2021, 1, 2, 3, 4, 5),
+                            start_register_date=datetime.datetime(2021, 1, 1),
+                            finish_register_date=datetime.datetime(2021, 2, 1),
+                            start_date=datetime.datetime(2021, 2, 2), finish_date=datetime.datetime(2021, 3, 1),
+                            description=None, price_1=None, price_2=None, type=None, inscription_type=None,
+                            facility=None, categories=[], rounds=[])
+    _assert_same_bytes(TOURNAMENT_JSON_MODEL(tournament))
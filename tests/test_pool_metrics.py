@@ -0,0 +1,15 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# The usage of the connection pools is exported to /metrics, where the values of all the workers are added up.
+
+import re
+
+
+def test_pool_metrics(client, auth_headers):
+    assert client.simulate_get("/tournamets/list", query_string="limit=5", headers=auth_headers).status_code == 200
+    body = client.simulate_get("/metrics").text
+    assert re.search(r'^damcore_db_pool_checked_out\{pool="primary"\} ', body, re.MULTILINE)
+    assert re.search(r'^damcore_db_pool_overflow\{pool="primary"\} ', body, re.MULTILINE)
+    checkouts = re.search(r'^damcore_db_pool_wait_seconds_count\{pool="primary"\} (\S+)', body, re.MULTILINE)
+    assert (checkouts is not None) and (float(checkouts.group(1)) > 0)
@@ -0,0 +1,35 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# The status filter of /tournamets/list has to use the ix_tournaments_status_* indexes for open and playing
+# tournaments, a small part of a table that is mostly closed ones. Same seed and plan as
+# dev/benchmarks/status_filter_plan.py, at a smaller scale.
+
+import pytest
+from sqlalchemy import text
+
+from db.models import Tournament, TournamentStatusEnum
+from dev.benchmarks.status_filter_plan import seed, explain
+
+SEEDED_TOURNAMENTS = 20000
+
+
+@pytest.fixture(scope="module")
+def seeded_session(database):
+    import db
+    db_session = db.create_db_session()
+    facility, owner = seed(db_session, SEEDED_TOURNAMENTS)
+    db_session.execute(text("ANALYZE"))
+    yield db_session
+    db_session.query(Tournament).filter(Tournament.facility_id == facility.id).delete(synchronize_session=False)
+    db_session.delete(facility)
+    db_session.delete(owner)
+    db_session.commit()
+    db_session.close()
+
+
+@pytest.mark.parametrize("status", [TournamentStatusEnum.open, TournamentStatusEnum.playing])
+def test_status_filter_uses_index(seeded_session, status):
+    plan, rows, elapsed = explain(seeded_session, status)
+    assert rows > 0
+    assert any("ix_tournaments_status" in line for line in plan), "\n".join(plan)
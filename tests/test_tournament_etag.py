@@ -0,0 +1,75 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# The ETag of /tournaments/show/{id} comes from Tournament.version, so it has to change when anything embedded in the
+# tournament changes: its facility, its categories or the name of the players of its matches. Logging in adds a token
+# to the user, which is not part of its JSON models, so it keeps the user's ETag.
+
+import base64
+
+import pytest
+
+from db.models import Tournament, Match, User
+
+
+@pytest.fixture
+def db_session(database):
+    import db
+    db_session = db.create_db_session()
+    yield db_session
+    db_session.close()
+
+
+def _etag(client, tournament_id):
+    result = client.simulate_get("/tournaments/show/{}".format(tournament_id))
+    assert result.status_code == 200
+    return result.headers["ETag"]
+
+
+def _change_and_check(client, db_session, tournament, change):
+    etag = _etag(client, tournament.id)
+    change()
+    db_session.commit()
+    assert _etag(client, tournament.id) != etag
+
+
+def test_facility_change(client, db_session):
+    tournament = db_session.query(Tournament).first()
+    _change_and_check(client, db_session, tournament,
+                      lambda: setattr(tournament.facility, "name", tournament.facility.name + " 2"))
+
+
+def test_category_change(client, db_session):
+    tournament = db_session.query(Tournament).filter(Tournament.categories.any()).first()
+    category = tournament.categories[0]
+    _change_and_check(client, db_session, tournament, lambda: setattr(category, "level", (category.level or 0) + 1))
+
+
+def test_player_rename(client, db_session):
+    match = db_session.query(Match).filter(Match.round.any(), Match.couple1_player1_id.isnot(None)).first()
+    tournament = match.round[0].tournament
+    player = db_session.query(User).get(match.couple1_player1_id)
+    _change_and_check(client, db_session, tournament, lambda: setattr(player, "name", (player.name or "") + " 2"))
+
+
+def test_other_player_changes_keep_the_etag(client, db_session):
+    match = db_session.query(Match).filter(Match.round.any(), Match.couple1_player1_id.isnot(None)).first()
+    tournament = match.round[0].tournament
+    player = db_session.query(User).get(match.couple1_player1_id)
+    etag = _etag(client, tournament.id)
+    player.club = "Another club"
+    db_session.commit()
+    assert _etag(client, tournament.id) == etag
+
+
+def test_login_keeps_the_user_etag(client, db_session):
+    credentials = base64.b64encode(b"player4:000000").decode("ascii")
+    etags = list()
+    for i in range(2):
+        result = client.simulate_post("/account/create_token", headers={"Authorization": "Basic " + credentials})
+        assert result.status_code == 200
+        profile = client.simulate_get("/account/profile", headers={"Authorization": result.json["token"]})
+        assert profile.status_code == 200
+        etags.append(profile.headers["ETag"])
+    assert etags[0] == etags[1]
+    assert db_session.query(User.version).filter(User.username == "player4").scalar() == 1
@@ -0,0 +1,36 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Tournament.json_model touches the facility, categories, rounds, matches and players of every tournament: the
+# loader options of resources/tournament_resources.py must load them with a fixed number of queries, whatever the
+# number of tournaments in the page.
+
+import pytest
+
+from cache import RESULT_CACHES
+
+
+def _list(client, auth_headers, query_string):
+    # Without the result cache every request queries the database
+    for result_cache in RESULT_CACHES.values():
+        result_cache.invalidate()
+    result = client.simulate_get("/tournamets/list", query_string=query_string, headers=auth_headers)
+    assert result.status_code == 200
+    return result
+
+
+@pytest.mark.parametrize("filters", ["", "status=C&", "genere=X&"])
+def test_list_query_count_does_not_grow_with_the_page(client, auth_headers, count_statements, filters):
+    _list(client, auth_headers, filters + "limit=1")  # authentication cached, mappers configured
+
+    small_page = count_statements(lambda: _list(client, auth_headers, filters + "limit=5"))
+    big_page = count_statements(lambda: _list(client, auth_headers, filters + "limit=50"))
+
+    assert len(small_page) == len(big_page), "\n".join(big_page)
+
+
+def test_show_query_count(client, auth_headers, count_statements):
+    first_tournament = count_statements(lambda: client.simulate_get("/tournaments/show/1"))
+    other_tournament = count_statements(lambda: client.simulate_get("/tournaments/show/2"))
+
+    assert len(first_tournament) == len(other_tournament)
@@ -0,0 +1,60 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Cached /tournamets/list pages have to be dropped when a commit changes something they include.
+
+import pytest
+
+from cache import RESULT_CACHES, ResultCache, create_cache_backend
+from db.models import User
+
+
+def _cache_status(client, auth_headers):
+    result = client.simulate_get("/tournamets/list", query_string="limit=20", headers=auth_headers)
+    assert result.status_code == 200
+    return result.headers["X-Cache"]
+
+
+@pytest.fixture
+def db_session(database):
+    import db
+    for result_cache in RESULT_CACHES.values():
+        result_cache.invalidate()
+    db_session = db.create_db_session()
+    yield db_session
+    db_session.close()
+
+
+def test_player_rename_invalidates(client, auth_headers, db_session):
+    assert _cache_status(client, auth_headers) == "MISS"
+    assert _cache_status(client, auth_headers) == "HIT"
+
+    user = db_session.query(User).filter(User.id == 2).one()
+    user.surname = user.surname + " Renamed"
+    db_session.commit()
+    assert _cache_status(client, auth_headers) == "MISS"
+
+
+def test_other_user_changes_keep_the_pages(client, auth_headers, db_session):
+    assert _cache_status(client, auth_headers) == "MISS"
+
+    user = db_session.query(User).filter(User.id == 2).one()
+    user.club = "Another club"
+    db_session.commit()
+    assert _cache_status(client, auth_headers) == "HIT"
+
+
+@pytest.mark.parametrize("backend", ["memory", "sqlite"])
+def test_replica_results_after_an_invalidation(backend, tmp_path):
+    result_cache = ResultCache("replica_grace_" + backend, create_cache_backend(
+        backend, 10, 60, str(tmp_path / "cache" / "pages.sqlite")), replica_grace=60)
+    try:
+        assert result_cache.set("page", (b"[]", None), from_replica=True)
+        result_cache.invalidate()
+        # The replica may not have the commit yet
+        assert not result_cache.set("page", (b"[]", None), from_replica=True)
+        assert result_cache.get("page") is None
+        assert result_cache.set("page", (b"[]", None))
+        assert result_cache.get("page") == (b"[]", None)
+    finally:
+        RESULT_CACHES.pop(result_cache.name)
@@ -0,0 +1,84 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+# Smaller copies of the uploaded images (profile photos, tournament posters), generated by a process pool after the
+# upload so the request never waits for them. They are stored next to the original as <name>_<size>.<format>.
+
+import logging
+import os
+
+from PIL import Image, ImageOps
+
+import settings
+from workers import BoundedProcessPool, WorkerPoolSaturated
+
+mylogger = logging.getLogger(__name__)
+
+THUMBNAILS_POOL = BoundedProcessPool(settings.THUMBNAIL_WORKERS, settings.THUMBNAIL_MAX_PENDING)
+
+_PIL_FORMATS = {"webp": "WEBP", "jpeg": "JPEG"}
+
+
+def thumbnail_filename(filename, size, image_format):
+    return "{}_{}.{}".format(os.path.splitext(filename)[0], size, image_format)
+
+
+def serialize_sizes(sizes):
+    # Stored in the *_thumbnails columns once every size has been written
+    return ",".join(str(size) for size in sizes)
+
+
+def parse_sizes(raw_sizes):
+    return [int(size) for size in raw_sizes.split(",")] if raw_sizes else []
+
+
+def generate_thumbnails(directory, filename, sizes, image_formats, quality):
+    # Runs in a worker of THUMBNAILS_POOL. The longest side is scaled down to each size (never up) and the EXIF
+    # orientation is applied, since the copies are written without metadata
+    with Image.open(os.path.join(directory, filename)) as original:
+        image = ImageOps.exif_transpose(original)
+        image.load()
+
+    if image.mode not in ("RGB", "RGBA"):
+        image = image.convert("RGBA" if "transparency" in image.info or image.mode in ("LA", "PA") else "RGB")
+
+    for size in sorted(sizes, reverse=True):
+        # Each size is scaled from the previous (bigger) one, which is much cheaper than from the original
+        image.thumbnail((size, size), Image.LANCZOS)
+        for image_format in image_formats:
+            aux_image = image
+            if (image_format == "jpeg") and (image.mode == "RGBA"):
+                # JPEG has no alpha channel, transparent areas become white
+                aux_image = Image.new("RGB", image.size, (255, 255, 255))
+                aux_image.paste(image, mask=image.getchannel("A"))
+            thumbnail_path = os.path.join(directory, thumbnail_filename(filename, size, image_format))
+            temp_file_path = thumbnail_path + "~"
+            aux_image.save(temp_file_path, _PIL_FORMATS[image_format], quality=quality, optimize=True)
+            os.replace(temp_file_path, thumbnail_path)
+
+    return serialize_sizes(sizes)
+
+
+def schedule_thumbnails(directory, filename, on_ready):
+    # on_ready(sizes) is called with the serialized sizes once the thumbnails are on disk, from a thread of the pool
+    # (or inline with THUMBNAIL_WORKERS = 0). Returns False if the pool is saturated and nothing was scheduled.
+    aux_args = (directory, filename, settings.THUMBNAIL_SIZES, settings.THUMBNAIL_FORMATS, settings.THUMBNAIL_QUALITY)
+
+    def _done(get_sizes):
+        try:
+            on_ready(get_sizes())
+        except Exception as e:
+            # The original keeps being served in place of the thumbnails
+            mylogger.error("Error generating the thumbnails of {}: {}".format(filename, e))
+
+    if THUMBNAILS_POOL.max_workers <= 0:
+        _done(lambda: generate_thumbnails(*aux_args))
+        return True
+
+    try:
+        aux_future = THUMBNAILS_POOL.submit(generate_thumbnails, *aux_args)
+    except WorkerPoolSaturated:
+        mylogger.warning("Thumbnail pool saturated, {} is served without thumbnails".format(filename))
+        return False
+    aux_future.add_done_callback(lambda future: _done(future.result))
+    return True
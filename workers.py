@@ -0,0 +1,68 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+import atexit
+import concurrent.futures
+import logging
+import os
+import threading
+
+mylogger = logging.getLogger(__name__)
+
+
+class WorkerPoolSaturated(Exception):
+    pass
+
+
+class BoundedProcessPool(object):
+    """Process pool for CPU bound work that refuses new jobs once max_pending are queued or running.
+
+    The executor is created lazily and again after a fork, so every gunicorn worker owns its own pool, and it is shut
+    down when the process exits. With max_workers = 0 jobs run inline in the calling thread.
+    """
+
+    def __init__(self, max_workers, max_pending):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self._pid = None
+        self._executor = None
+        self._slots = None
+        self._atexit_pid = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        with self._lock:
+            if self._pid != os.getpid():
+                mylogger.debug("Starting process pool with {} workers".format(self.max_workers))
+                self._executor = concurrent.futures.ProcessPoolExecutor(max_workers=self.max_workers)
+                if self._atexit_pid != os.getpid():
+                    # Left to the garbage collector it would be collected while the interpreter is tearing down
+                    atexit.register(self.shutdown)
+                    self._atexit_pid = os.getpid()
+                self._slots = threading.BoundedSemaphore(self.max_pending)
+                self._pid = os.getpid()
+            return self._executor, self._slots
+
+    def submit(self, function, *args):
+        executor, slots = self._get_executor()
+        if not slots.acquire(blocking=False):
+            raise WorkerPoolSaturated()
+        try:
+            aux_future = executor.submit(function, *args)
+        except Exception:
+            slots.release()
+            raise
+        aux_future.add_done_callback(lambda future: slots.release())
+        return aux_future
+
+    def run(self, function, *args):
+        if self.max_workers <= 0:
+            return function(*args)
+        return self.submit(function, *args).result()
+
+    def shutdown(self):
+        with self._lock:
+            if (self._executor is not None) and (self._pid == os.getpid()):
+                self._executor.shutdown(wait=True)
+            self._executor = None
+            self._pid = None